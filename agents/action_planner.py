@@ -1,8 +1,7 @@
-from ollama import Client
-client = Client()
+from core.llm import chat
+from core.tokens import fit_to_budget
 
-def plan_action(answer):
-    prompt = f"""Given the response below, analyze it to identify immediate next steps, 
+PROMPT = """Given the response below, analyze it to identify immediate next steps, 
     potential improvements, and strategic follow-up questions. Translate insights into clear, 
     actionable recommendations that can be implemented in real time. 
     Prioritize suggestions based on impact and feasibility. Where relevant, include timelines, 
@@ -13,5 +12,8 @@ Answer:
 
 Plan:
 """
-    result = client.chat(model="gemma:2b", messages=[{"role": "user", "content": prompt}])
-    return result["message"]["content"]
+
+def plan_action(answer, stream=False):
+    answer = fit_to_budget(str(answer), PROMPT.format(answer=""))
+    prompt = PROMPT.format(answer=answer)
+    return chat(prompt, stream=stream, agent="actions")
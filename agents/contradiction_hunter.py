@@ -1,8 +1,7 @@
-from ollama import Client
-client = Client()
+from core.llm import chat
+from core.tokens import fit_to_budget
 
-def find_contradictions(answer, context):
-    prompt = f"""Review the following answer against the provided context to detect any contradictions, 
+PROMPT = """Review the following answer against the provided context to detect any contradictions, 
     inconsistencies, or logical fallacies. Flag discrepancies clearly and explain why they are contradictory, 
     referencing specific elements from the context. Recommend how to resolve or reframe the contradictions for clarity,
      accuracy, and alignment with the original context.
@@ -14,5 +13,8 @@ Answer:
 {answer}
 
 List any contradictions or write 'None':"""
-    result = client.chat(model="gemma:2b", messages=[{"role": "user", "content": prompt}])
-    return result["message"]["content"]
+
+def find_contradictions(answer, context, stream=False):
+    context = fit_to_budget(str(context), PROMPT.format(context="", answer=answer))
+    prompt = PROMPT.format(context=context, answer=answer)
+    return chat(prompt, stream=stream, agent="contradictions")
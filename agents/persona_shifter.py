@@ -1,8 +1,7 @@
-from ollama import Client
-client = Client()
+from core.llm import chat
+from core.tokens import fit_to_budget
 
-def shift_persona(answer, persona):
-    prompt = f"""Rewrite the following answer in the style, tone, and mindset of a {persona}. 
+PROMPT = """Rewrite the following answer in the style, tone, and mindset of a {persona}. 
     Reflect their unique voice, values, priorities, and communication style. Maintain the original meaning,
       but adapt phrasing, structure, and emphasis to match how this persona would genuinely express the content..
     
@@ -11,5 +10,8 @@ Answer:
 
 Persona-style answer:
 """
-    result = client.chat(model="gemma:2b", messages=[{"role": "user", "content": prompt}])
-    return result["message"]["content"]
+
+def shift_persona(answer, persona, stream=False):
+    answer = fit_to_budget(str(answer), PROMPT.format(persona=persona, answer=""))
+    prompt = PROMPT.format(persona=persona, answer=answer)
+    return chat(prompt, stream=stream, agent="persona")
@@ -0,0 +1,318 @@
+"""
+Local HTTP API over the document index and the multi-agent pipeline.
+
+Run with:
+
+    uvicorn api.server:app --host 127.0.0.1 --port 8000
+
+Documents are indexed into named collections that live for the lifetime of the server
+and are shared by every client. Requests that call the LLM wait in a bounded queue for
+one of a fixed number of slots, so Ollama never sees more work than it can run in
+parallel; when the queue is full the server answers 503 with a Retry-After header.
+The LLM gateway (core.llm_gateway) applies the same back-pressure to individual LLM
+calls, and its rejections are reported the same way.
+"""
+import asyncio
+import json
+import os
+import threading
+from contextlib import asynccontextmanager, contextmanager
+from typing import List, Optional
+
+from fastapi import FastAPI, File, HTTPException, UploadFile
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
+from pydantic import BaseModel
+
+from core.index_cache import content_hash
+from core.ingest import ingest_documents
+from core.llm_gateway import gateway, LLMBusyError
+from core.models import embedding_dimension, warmup
+from core.rag_chain import RAGChain
+from core.telemetry import render_prometheus
+from run_multiagent import run_multiagent_pipeline
+
+# LLM-bound requests running at once; defaults to what Ollama itself runs in parallel
+MAX_CONCURRENT_REQUESTS = int(os.environ.get("ASKYOURDOCSX_MAX_CONCURRENT_REQUESTS",
+                                             os.environ.get("OLLAMA_NUM_PARALLEL", "2")))
+# LLM-bound requests allowed to wait for a slot before new ones are rejected
+MAX_QUEUED_REQUESTS = int(os.environ.get("ASKYOURDOCSX_MAX_QUEUED_REQUESTS", "32"))
+TOP_K = 5
+
+class ReadWriteLock:
+    """Many concurrent readers (queries) or one writer (ingest/remove); waiting writers go first."""
+
+    def __init__(self):
+        self._condition = threading.Condition()
+        self._readers = 0
+        self._writer = False
+        self._writers_waiting = 0
+
+    @contextmanager
+    def read(self):
+        with self._condition:
+            while self._writer or self._writers_waiting:
+                self._condition.wait()
+            self._readers += 1
+        try:
+            yield
+        finally:
+            with self._condition:
+                self._readers -= 1
+                if not self._readers:
+                    self._condition.notify_all()
+
+    @contextmanager
+    def write(self):
+        with self._condition:
+            self._writers_waiting += 1
+            while self._writer or self._readers:
+                self._condition.wait()
+            self._writers_waiting -= 1
+            self._writer = True
+        try:
+            yield
+        finally:
+            with self._condition:
+                self._writer = False
+                self._condition.notify_all()
+
+class Collection:
+    """A shared index plus the per-document records needed to answer questions over it."""
+
+    def __init__(self, name):
+        self.name = name
+        self.rag = RAGChain(dimension=embedding_dimension(), top_k=TOP_K, index_type="auto")
+        self.documents = {}  # document name -> {"name", "hash", "size", "pages", "chunks"}
+        self.texts = {}      # document name -> extracted text
+        self.lock = ReadWriteLock()
+        # Questions hold the read side only while they retrieve, not while the LLM runs
+        self.rag.read_lock = self.lock.read
+
+    def text_content(self):
+        return "\n".join(self.texts[name] for name in self.documents).strip()
+
+    def describe(self):
+        return {"name": self.name, "documents": list(self.documents.values()), "dedup": self.rag.dedup_stats()}
+
+class RequestLimiter:
+    """Admission control for LLM-bound requests: a fixed number of slots and a bounded queue."""
+
+    def __init__(self, max_concurrent, max_queued):
+        self.semaphore = asyncio.Semaphore(max_concurrent)
+        self.max_queued = max_queued
+        self.waiting = 0
+        self.running = 0
+
+    async def acquire(self):
+        if self.waiting >= self.max_queued:
+            raise HTTPException(status_code=503, detail="Too many queued requests", headers={"Retry-After": "1"})
+        self.waiting += 1
+        try:
+            await self.semaphore.acquire()
+        finally:
+            self.waiting -= 1
+        self.running += 1
+
+    def release(self):
+        self.running -= 1
+        self.semaphore.release()
+
+_collections = {}
+_collections_lock = threading.Lock()
+limiter = RequestLimiter(MAX_CONCURRENT_REQUESTS, MAX_QUEUED_REQUESTS)
+
+def get_collection(name, create=False):
+    with _collections_lock:
+        if name not in _collections:
+            if not create:
+                raise HTTPException(status_code=404, detail=f"Unknown collection '{name}'")
+            _collections[name] = Collection(name)
+        return _collections[name]
+
+async def run_in_slot(fn):
+    """Run a blocking LLM-bound call in a worker thread once a request slot is free."""
+    await limiter.acquire()
+    loop = asyncio.get_running_loop()
+    future = loop.run_in_executor(None, fn)
+    # The slot is held until the work really ends, even if the client disconnects first
+    future.add_done_callback(lambda _: limiter.release())
+    return await asyncio.shield(future)
+
+@asynccontextmanager
+async def lifespan(app):
+    # Load the embedder and the LLM while the server starts accepting connections
+    threading.Thread(target=warmup, kwargs={"llm": True}, daemon=True).start()
+    yield
+
+app = FastAPI(title="AskYourDocsX", lifespan=lifespan)
+
+@app.exception_handler(LLMBusyError)
+async def llm_busy(request, exc):
+    return JSONResponse(status_code=503, content={"detail": str(exc)}, headers={"Retry-After": "1"})
+
+class SearchRequest(BaseModel):
+    question: str
+    top_k: Optional[int] = None
+    filters: Optional[dict] = None
+
+class QueryRequest(BaseModel):
+    questions: List[str]
+    filters: Optional[dict] = None
+
+class AskRequest(BaseModel):
+    question: str
+    persona: str = "General Assistant"
+    filters: Optional[dict] = None
+    stream: bool = False
+
+@app.get("/health")
+def health():
+    return {
+        "status": "ok",
+        "collections": len(_collections),
+        "running": limiter.running,
+        "queued": limiter.waiting,
+        "max_concurrent": MAX_CONCURRENT_REQUESTS,
+        "llm": gateway.stats(),
+    }
+
+@app.get("/metrics", response_class=PlainTextResponse)
+def prometheus_metrics():
+    """Span latency histograms and LLM token counters in the Prometheus text format."""
+    return render_prometheus()
+
+@app.get("/collections/{name}")
+def describe_collection(name: str):
+    return get_collection(name).describe()
+
+@app.post("/collections/{name}/documents")
+async def add_documents(name: str, files: List[UploadFile] = File(...)):
+    """Index uploaded files; a file whose name and content are already indexed is not re-processed."""
+    collection = get_collection(name, create=True)
+    uploads = [(file.filename, await file.read()) for file in files]
+    sizes = {filename: len(data) for filename, data in uploads}
+
+    def ingest():
+        results = {}
+        changed = []
+        with collection.lock.read():
+            for filename, data in uploads:
+                known = collection.documents.get(filename)
+                if known is not None and known["hash"] == content_hash(data):
+                    results[filename] = dict(known, text=collection.texts[filename], error=None)
+                else:
+                    changed.append((filename, data))
+
+        def on_document(result):
+            results[result["name"]] = result
+            if result["text"]:
+                with collection.lock.write():
+                    collection.texts[result["name"]] = result["text"]
+                    collection.documents[result["name"]] = {
+                        "name": result["name"],
+                        "hash": result["hash"],
+                        "size": sizes[result["name"]],
+                        "pages": result["pages"],
+                        "chunks": result["chunks"],
+                    }
+
+        # Files are parsed without the lock; it is only taken while each document's index entry changes
+        stats = ingest_documents(changed, collection.rag, on_document=on_document, lock=collection.lock.write)
+        return {"stats": stats, "documents": [results[filename] for filename, _ in uploads if filename in results]}
+
+    # Parsing and embedding are CPU work, not LLM work, so they do not take a request slot
+    return await asyncio.get_running_loop().run_in_executor(None, ingest)
+
+@app.delete("/collections/{name}/documents/{document}")
+async def remove_document(name: str, document: str):
+    collection = get_collection(name)
+
+    def remove():
+        with collection.lock.write():
+            collection.documents.pop(document, None)
+            collection.texts.pop(document, None)
+            return collection.rag.remove_document(document)
+
+    removed = await asyncio.get_running_loop().run_in_executor(None, remove)
+    return {"document": document, "chunks_removed": removed}
+
+@app.post("/collections/{name}/search")
+async def search(name: str, request: SearchRequest):
+    """Retrieve chunks without calling the LLM."""
+    collection = get_collection(name)
+
+    def run():
+        results, _ = collection.rag.search(request.question, request.top_k, request.filters)
+        return [
+            dict(result, distance=None if result["distance"] is None else float(result["distance"]))
+            for result in results
+        ]
+
+    return {"results": await asyncio.get_running_loop().run_in_executor(None, run)}
+
+@app.post("/collections/{name}/query")
+async def query(name: str, request: QueryRequest):
+    """Answer questions with retrieval and a single LLM call each (no agents)."""
+    collection = get_collection(name)
+
+    def run():
+        answers = collection.rag.query(request.questions, filters=request.filters)
+        return answers if isinstance(answers, list) else [answers]
+
+    return {"answers": await run_in_slot(run)}
+
+@app.post("/collections/{name}/ask")
+async def ask(name: str, request: AskRequest):
+    """
+    Run the multi-agent pipeline for one question.
+
+    With "stream": true the response is NDJSON: {"token": ...} lines while the answer is
+    generated, then one {"results": {...}} line (or {"error": ...}).
+    """
+    collection = get_collection(name)
+    loop = asyncio.get_running_loop()
+    if not collection.documents:
+        raise HTTPException(status_code=400, detail="The collection has no indexed documents.")
+
+    def pipeline(on_token=None):
+        # The context agent reads the per-document analyses; the full text is only
+        # joined for a chain that has none
+        text_content = ""
+        if not collection.rag.contexts:
+            with collection.lock.read():
+                text_content = collection.text_content()
+        # The index is read-locked inside the chain's retrieval calls only
+        return run_multiagent_pipeline(
+            text_content,
+            persona=request.persona,
+            question=request.question,
+            rag_chain=collection.rag,
+            on_token=on_token,
+            filters=request.filters,
+        )
+
+    if not request.stream:
+        return {"results": await run_in_slot(pipeline)}
+
+    events = asyncio.Queue()
+
+    def emit(event):
+        loop.call_soon_threadsafe(events.put_nowait, event)
+
+    def stream_pipeline():
+        try:
+            emit({"results": pipeline(on_token=lambda token: emit({"token": token}))})
+        except Exception as e:
+            emit({"error": str(e)})
+        finally:
+            emit(None)
+
+    # Queue for a slot before responding, so a full queue is still reported as a 503
+    await limiter.acquire()
+    loop.run_in_executor(None, stream_pipeline).add_done_callback(lambda _: limiter.release())
+
+    async def body():
+        while (event := await events.get()) is not None:
+            yield json.dumps(event, ensure_ascii=False, default=str) + "\n"
+
+    return StreamingResponse(body(), media_type="application/x-ndjson")
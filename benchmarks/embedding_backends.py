@@ -0,0 +1,116 @@
+"""
+Accuracy-vs-throughput check for the embedding backends in core.models.
+
+Embeds the sample documents under data/processed_text with every backend, then
+compares each one against the fp32 PyTorch reference:
+
+- throughput: chunks encoded per second (cold, caches disabled)
+- agreement: mean cosine similarity between a chunk's reference and backend vector
+- recall@k: overlap between the top-k FaissVectorStore.search results of the
+  reference index and the backend's index, for queries drawn from the documents
+
+Run from the repository root:
+
+    python -m benchmarks.embedding_backends --backends torch onnx onnx-int8 --top-k 5
+"""
+import argparse
+import glob
+import json
+import os
+import re
+import sys
+import time
+
+import numpy as np
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from core.chunker import chunk_text, CHUNK_SIZE
+from core.embeder import EmbeddingService
+from core.models import EMBEDDING_BACKENDS, load_embedder, embedder_id, embedding_dimension
+from core.vectorstore import FaissVectorStore
+
+SAMPLE_DIR = "data/processed_text"
+
+def load_chunks(sample_dir, chunk_size):
+    chunks = []
+    for path in sorted(glob.glob(os.path.join(sample_dir, "*.txt"))):
+        with open(path, "r", encoding="utf-8", errors="ignore") as f:
+            text = f.read().strip()
+        if text:
+            chunks.extend(chunk_text(text, chunk_size=chunk_size))
+    return chunks
+
+def make_queries(chunks, limit):
+    # First sentence of each chunk: short, natural-language and with a known answer
+    queries = []
+    for chunk in chunks:
+        sentence = re.split(r"(?<=[.!?])\s+|\n", chunk.strip(), maxsplit=1)[0].strip()
+        if len(sentence.split()) >= 4:
+            queries.append(sentence[:300])
+        if len(queries) >= limit:
+            break
+    return queries
+
+def embed_with(backend, texts, batch_size):
+    # A fresh service per run: no cache hits, so the timing measures the model
+    service = EmbeddingService(batch_size=batch_size, cache_path=None,
+                               model=load_embedder(backend), model_id=embedder_id(backend))
+    service.embed(texts[:batch_size])  # Warm-up: first-call graph and thread-pool setup
+    service.memory_cache.clear()
+    start = time.perf_counter()
+    vectors = service.embed(texts)
+    return vectors, time.perf_counter() - start, service
+
+def top_ids(vectors, query_vectors, top_k):
+    store = FaissVectorStore(dimension=vectors.shape[1])
+    store.add(vectors, [str(i) for i in range(len(vectors))])
+    return [{result["id"] for result in results} for results in store.search_batch(query_vectors, top_k)]
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--backends", nargs="+", default=list(EMBEDDING_BACKENDS), choices=EMBEDDING_BACKENDS)
+    parser.add_argument("--sample-dir", default=SAMPLE_DIR)
+    parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE, help="Tokens per chunk")
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--top-k", type=int, default=5)
+    parser.add_argument("--batch-size", type=int, default=64)
+    parser.add_argument("--output", help="Also write the JSON report to this file")
+    args = parser.parse_args()
+
+    chunks = load_chunks(args.sample_dir, args.chunk_size)
+    if not chunks:
+        sys.exit(f"No sample text found under {args.sample_dir}")
+    queries = make_queries(chunks, args.queries)
+    print(f"{len(chunks)} chunks, {len(queries)} queries, dimension {embedding_dimension()}")
+
+    reference_vectors, _, reference = embed_with("torch", chunks, args.batch_size)
+    reference_top = top_ids(reference_vectors, reference.embed(queries), args.top_k)
+
+    report = []
+    for backend in args.backends:
+        try:
+            vectors, seconds, service = embed_with(backend, chunks, args.batch_size)
+        except Exception as e:  # Missing optional runtime (onnxruntime/optimum) or model file
+            print(f"{backend:>10}: skipped ({e})")
+            report.append({"backend": backend, "error": str(e)})
+            continue
+        backend_top = top_ids(vectors, service.embed(queries), args.top_k)
+        recall = np.mean([len(ref & got) / len(ref) for ref, got in zip(reference_top, backend_top) if ref])
+        row = {
+            "backend": backend,
+            "chunks_per_second": len(chunks) / seconds if seconds else 0.0,
+            "seconds": seconds,
+            "cosine_agreement": float(np.mean(np.sum(vectors * reference_vectors, axis=1))),
+            f"recall@{args.top_k}": float(recall),
+        }
+        report.append(row)
+        print(f"{backend:>10}: {row['chunks_per_second']:8.1f} chunks/s  "
+              f"cosine {row['cosine_agreement']:.4f}  recall@{args.top_k} {recall:.3f}")
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump({"chunks": len(chunks), "queries": len(queries), "results": report}, f, indent=2)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,132 @@
+"""
+Local mock of the Ollama HTTP API (/api/chat, /api/generate) for load tests.
+
+Replies come from StubOllamaClient, so latency, throughput and the server's own
+parallelism are configurable. Point the app at it with OLLAMA_HOST:
+
+    python -m benchmarks.mock_ollama --port 11435 --parallel 2
+    OLLAMA_HOST=http://127.0.0.1:11435 uvicorn api.server:app
+
+GET /stats reports the requests in flight, the peak seen so far and the options and
+keep_alive each request carried, so a test can check what the app sent.
+"""
+import argparse
+import json
+import os
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from benchmarks.stubs import StubOllamaClient
+
+class MockOllamaServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, client):
+        super().__init__(address, MockOllamaHandler)
+        self.client = client
+        self.lock = threading.Lock()
+        self.active = 0
+        self.peak = 0
+        self.requests = []
+
+    def stats(self):
+        with self.lock:
+            return {"active": self.active, "peak": self.peak, "requests": list(self.requests)}
+
+class MockOllamaHandler(BaseHTTPRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+    def _send_json(self, payload, status=200):
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        if self.path == "/stats":
+            self._send_json(self.server.stats())
+        else:
+            self._send_json({"error": "not found"}, status=404)
+
+    def do_POST(self):
+        if self.path not in ("/api/chat", "/api/generate"):
+            self._send_json({"error": "not found"}, status=404)
+            return
+        request = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+        server = self.server
+        with server.lock:
+            server.active += 1
+            server.peak = max(server.peak, server.active)
+            server.requests.append({
+                "path": self.path,
+                "model": request.get("model"),
+                "options": request.get("options"),
+                "keep_alive": request.get("keep_alive"),
+            })
+        try:
+            self._reply(request)
+        finally:
+            with server.lock:
+                server.active -= 1
+
+    def _reply(self, request):
+        client = self.server.client
+        model = request.get("model")
+        stream = request.get("stream", True)  # Ollama streams unless told otherwise
+        header = {"model": model, "created_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime())}
+
+        if self.path == "/api/generate":
+            reply = client.generate(model, prompt=request.get("prompt", ""))
+            parts = [dict(header, response=reply["response"], done=True)]
+        elif stream:
+            parts = (
+                {**header, **part, "message": {"role": "assistant", "content": part["message"]["content"]}}
+                for part in client.chat(model, request.get("messages", []), stream=True)
+            )
+        else:
+            reply = client.chat(model, request.get("messages", []))
+            parts = [{**header, **reply, "message": {"role": "assistant", "content": reply["message"]["content"]}}]
+
+        if not stream:
+            self._send_json(next(iter(parts)))
+            return
+        self.send_response(200)
+        self.send_header("Content-Type", "application/x-ndjson")
+        self.end_headers()
+        for part in parts:
+            self.wfile.write((json.dumps(part) + "\n").encode("utf-8"))
+            self.wfile.flush()
+
+def serve(host="127.0.0.1", port=11435, client=None):
+    """Start the mock server on a background thread and return it (call shutdown() to stop)."""
+    server = MockOllamaServer((host, port), client or StubOllamaClient())
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=11435)
+    parser.add_argument("--latency", type=float, default=0.05, help="Seconds to first token")
+    parser.add_argument("--tokens-per-second", type=float, default=200.0)
+    parser.add_argument("--response-tokens", type=int, default=64)
+    parser.add_argument("--parallel", type=int, default=2, help="Requests served at once, like OLLAMA_NUM_PARALLEL")
+    args = parser.parse_args()
+
+    client = StubOllamaClient(args.latency, args.tokens_per_second, args.response_tokens, args.parallel)
+    server = MockOllamaServer((args.host, args.port), client)
+    print(f"Mock Ollama listening on http://{args.host}:{args.port}", file=sys.stderr)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+"""Offline stand-ins for Ollama and the embedding model, with configurable cost."""
+import re
+import threading
+import time
+import zlib
+
+import numpy as np
+
+_TOKEN = re.compile(r"\w+")
+
+class StubOllamaClient:
+    """
+    Mimics the parts of ollama.Client the app uses (chat, generate).
+
+    Every call waits `first_token_latency` seconds and then emits `response_tokens`
+    tokens at `tokens_per_second`, like a local model would. At most `num_parallel`
+    calls are served at once; the rest queue, as with OLLAMA_NUM_PARALLEL.
+    """
+
+    def __init__(self, first_token_latency=0.05, tokens_per_second=200.0, response_tokens=64, num_parallel=4):
+        self.first_token_latency = first_token_latency
+        self.tokens_per_second = tokens_per_second
+        self.response_tokens = response_tokens
+        self.slots = threading.Semaphore(num_parallel)
+        self.calls = 0
+
+    def _tokens(self, prompt):
+        self.calls += 1
+        seed = zlib.crc32(prompt.encode("utf-8"))
+        with self.slots:
+            time.sleep(self.first_token_latency)
+            for i in range(self.response_tokens):
+                if self.tokens_per_second:
+                    time.sleep(1.0 / self.tokens_per_second)
+                yield f"tok{(seed + i) % 997} "
+
+    def _usage(self, prompt):
+        # Final-response fields as Ollama reports them (durations in nanoseconds)
+        return {
+            "done": True,
+            "prompt_eval_count": len(prompt.split()),
+            "eval_count": self.response_tokens,
+            "prompt_eval_duration": int(self.first_token_latency * 1e9),
+            "eval_duration": int(self.response_tokens / self.tokens_per_second * 1e9) if self.tokens_per_second else 0,
+        }
+
+    def _stream(self, prompt):
+        for token in self._tokens(prompt):
+            yield {"message": {"content": token}, "done": False}
+        yield dict(self._usage(prompt), message={"content": ""})
+
+    def chat(self, model, messages, stream=False, **kwargs):
+        prompt = messages[-1]["content"]
+        if stream:
+            return self._stream(prompt)
+        return dict(self._usage(prompt), message={"content": "".join(self._tokens(prompt))})
+
+    def generate(self, model, prompt="", stream=False, **kwargs):
+        if not prompt:
+            return {"response": "", "done": True}  # Model load request
+        return {"response": "".join(self._tokens(prompt)), "done": True}
+
+class HashingEmbedder:
+    """
+    Deterministic bag-of-words embedder (feature hashing), standing in for the
+    sentence-transformers model when its weights are not available offline.
+
+    Texts sharing words get similar vectors, so retrieval benchmarks stay meaningful.
+    """
+
+    def __init__(self, dimension=384):
+        self.dimension = dimension
+
+    def get_sentence_embedding_dimension(self):
+        return self.dimension
+
+    def encode(self, texts, batch_size=64, show_progress_bar=False, **kwargs):
+        vectors = np.zeros((len(texts), self.dimension), dtype="float32")
+        for row, text in enumerate(texts):
+            for token in _TOKEN.findall(text.lower()):
+                h = zlib.crc32(token.encode("utf-8"))
+                vectors[row, h % self.dimension] += 1.0 if h & 0x80000000 else -1.0
+        return vectors
@@ -0,0 +1,256 @@
+"""
+Offline benchmark suite for ingest, retrieval and the multi-agent pipeline.
+
+For every corpus size it generates a deterministic synthetic document and measures
+each stage on its own:
+
+- parse: parse_file on a generated PDF (pages/s)
+- chunk: chunk_text over the extracted text (chunks/s)
+- embed: embed_chunks throughput with a cold cache (chunks/s)
+- store: FaissVectorStore.add time, per-query search p50/p95 and recall@k against
+  exact search, for each index type
+- pipeline: run_multiagent_pipeline end to end, p50/p95 and per-stage means
+- mmap: resident memory of loading a saved flat store with and without mmap, measured
+  once in fresh processes; "shared" is false if the mapped load copied the vectors
+
+The LLM is always a stub with configurable latency, so no Ollama server is needed.
+The embedder defaults to an offline hashing stand-in; pass --embedder model to time
+the real sentence-transformers model. Results are printed (or written) as JSON so
+runs can be compared across commits:
+
+    python -m benchmarks.suite --pages 1 100 1000 --output bench.json
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import faiss
+
+from benchmarks.stubs import HashingEmbedder, StubOllamaClient
+from benchmarks.synthetic import make_pages, make_pdf, make_queries
+from core import models
+from core.chunker import chunk_text
+from core.embeder import EmbeddingService, embedding_service
+from core.llm_cache import response_cache
+from core.pdfreader import parse_file
+from core.rag_chain import RAGChain
+from core.vectorstore import FaissVectorStore
+from run_multiagent import run_multiagent_pipeline
+
+def percentiles(samples):
+    if not samples:
+        return {"p50": 0.0, "p95": 0.0, "mean": 0.0}
+    return {
+        "p50": float(np.percentile(samples, 50)),
+        "p95": float(np.percentile(samples, 95)),
+        "mean": float(np.mean(samples)),
+    }
+
+def bench_parse(pages):
+    pdf = make_pdf(pages)
+    with tempfile.TemporaryDirectory() as workdir:
+        path = os.path.join(workdir, "synthetic.pdf")
+        with open(path, "wb") as f:
+            f.write(pdf)
+        cwd = os.getcwd()
+        os.chdir(workdir)  # parse_file also saves the text under ./data/processed_text
+        try:
+            with contextlib.redirect_stdout(io.StringIO()):
+                start = time.perf_counter()
+                text = parse_file(path)
+                seconds = time.perf_counter() - start
+        finally:
+            os.chdir(cwd)
+    return text, {"pdf_bytes": len(pdf), "seconds": seconds, "pages_per_second": len(pages) / seconds}
+
+def bench_chunk(text):
+    start = time.perf_counter()
+    chunks = chunk_text(text)
+    seconds = time.perf_counter() - start
+    return chunks, {"chunks": len(chunks), "seconds": seconds, "chunks_per_second": len(chunks) / seconds if seconds else 0.0}
+
+def bench_embed(chunks, embedder, batch_size):
+    service = EmbeddingService(batch_size=batch_size, cache_path=None, model=embedder)
+    start = time.perf_counter()
+    vectors = service.embed(chunks)
+    seconds = time.perf_counter() - start
+    return vectors, {"seconds": seconds, "chunks_per_second": len(chunks) / seconds if seconds else 0.0}
+
+def bench_store(vectors, chunks, query_vectors, index_types, top_k):
+    exact = faiss.IndexFlatL2(vectors.shape[1])
+    exact.add(vectors)
+    _, truth = exact.search(query_vectors, top_k)
+
+    report = {}
+    for index_type in index_types:
+        store = FaissVectorStore(vectors.shape[1], index_type=index_type)
+        start = time.perf_counter()
+        store.add(vectors, chunks)
+        add_seconds = time.perf_counter() - start
+
+        latencies, found = [], []
+        for query in query_vectors:
+            start = time.perf_counter()
+            results = store.search(query, top_k)
+            latencies.append(time.perf_counter() - start)
+            found.append({result["id"] for result in results})
+        start = time.perf_counter()
+        store.search_batch(query_vectors, top_k)
+        batch_seconds = time.perf_counter() - start
+
+        recall = np.mean([len(set(row.tolist()) & got) / len(row) for row, got in zip(truth, found)])
+        report[index_type] = {
+            "built_type": store.built_type,
+            "add_seconds": add_seconds,
+            "search_seconds": percentiles(latencies),
+            "batch_search_seconds": batch_seconds,
+            f"recall@{top_k}": float(recall),
+        }
+    return report
+
+def bench_pipeline(text, queries, runs):
+    rag_chain = RAGChain(dimension=models.embedding_dimension())
+    start = time.perf_counter()
+    rag_chain.build_index(text)
+    index_seconds = time.perf_counter() - start
+
+    totals, stages = [], {}
+    for question in queries[:runs]:
+        response_cache.backend.clear()  # Every run pays for its LLM calls
+        with contextlib.redirect_stdout(io.StringIO()):
+            results = run_multiagent_pipeline(text, persona="General Assistant", question=question, rag_chain=rag_chain)
+        for stage, seconds in results["timings"].items():
+            stages.setdefault(stage, []).append(seconds)
+        totals.append(results["timings"]["total"])
+    return {
+        "index_seconds": index_seconds,
+        "total_seconds": percentiles(totals),
+        "stage_mean_seconds": {stage: float(np.mean(samples)) for stage, samples in stages.items()},
+    }
+
+RSS_PROBE = """
+import json, os, sys
+from core.vectorstore import FaissVectorStore
+
+def rss_mb():
+    with open("/proc/self/statm") as f:
+        return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2**20
+
+before = rss_mb()
+store = FaissVectorStore.load(sys.argv[1], mmap=sys.argv[2] == "1")
+print(json.dumps(rss_mb() - before))
+"""
+
+def bench_mmap(dimension, count=100000):
+    if not os.path.exists("/proc/self/statm"):
+        return {"skipped": "resident memory is only measured on Linux"}
+    vectors = np.random.default_rng(0).standard_normal((count, dimension)).astype("float32")
+    root = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+    with tempfile.TemporaryDirectory() as workdir:
+        store = FaissVectorStore(dimension)
+        store.add(vectors, [""] * count)
+        store.save(workdir)
+        del store
+        rss = {}
+        for mode, flag in (("mmap", "1"), ("copy", "0")):
+            probe = subprocess.run([sys.executable, "-c", RSS_PROBE, workdir, flag],
+                                   capture_output=True, text=True, check=True, cwd=root)
+            rss[mode] = float(probe.stdout.strip())
+    vectors_mb = vectors.nbytes / 2**20
+    return {
+        "vectors": count,
+        "vectors_mb": vectors_mb,
+        "load_rss_mb": rss,
+        # A mapped load should cost a small fraction of the vectors' size
+        "shared": rss["mmap"] < 0.25 * vectors_mb,
+    }
+
+def environment():
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True).stdout.strip()
+    except Exception:
+        commit = None
+    return {
+        "commit": commit,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "processor": platform.processor(),
+        "cpu_count": os.cpu_count(),
+        "numpy": np.__version__,
+        "faiss": faiss.__version__,
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pages", type=int, nargs="+", default=[1, 100, 1000], help="Corpus sizes in pages (up to 10000)")
+    parser.add_argument("--stages", nargs="+", default=["parse", "chunk", "embed", "store", "pipeline", "mmap"],
+                        choices=["parse", "chunk", "embed", "store", "pipeline", "mmap"])
+    parser.add_argument("--index-types", nargs="+", default=["flat", "hnsw", "ivf_flat"])
+    parser.add_argument("--queries", type=int, default=100, help="Queries for the store benchmark")
+    parser.add_argument("--pipeline-runs", type=int, default=5)
+    parser.add_argument("--top-k", type=int, default=5)
+    parser.add_argument("--batch-size", type=int, default=64)
+    parser.add_argument("--embedder", choices=["hashing", "model"], default="hashing")
+    parser.add_argument("--llm-latency", type=float, default=0.05, help="Stub LLM seconds to first token")
+    parser.add_argument("--llm-tokens-per-second", type=float, default=200.0)
+    parser.add_argument("--llm-response-tokens", type=int, default=64)
+    parser.add_argument("--llm-parallel", type=int, default=4, help="Stub LLM calls served at once")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="Write the JSON report here instead of stdout")
+    args = parser.parse_args()
+
+    models.set_client(StubOllamaClient(args.llm_latency, args.llm_tokens_per_second,
+                                       args.llm_response_tokens, args.llm_parallel))
+    if args.embedder == "hashing":
+        models.set_embedder(HashingEmbedder(models.embedding_dimension()))
+    embedder = models.get_embedder()
+    embedding_service.model_id = f"benchmark-{args.embedder}"  # Keep stand-in vectors out of the real cache
+
+    results = []
+    for page_count in args.pages:
+        print(f"[bench] {page_count} pages", file=sys.stderr)
+        pages = make_pages(page_count, seed=args.seed)
+        queries = make_queries(pages, max(args.queries, args.pipeline_runs), seed=args.seed)
+        row = {"pages": page_count, "words": sum(len(page.split()) for page in pages)}
+
+        text = "\n".join(pages)
+        if "parse" in args.stages:
+            text, row["parse"] = bench_parse(pages)
+        chunks, row["chunk"] = bench_chunk(text)
+        if "embed" in args.stages or "store" in args.stages:
+            vectors, embed_report = bench_embed(chunks, embedder, args.batch_size)
+            if "embed" in args.stages:
+                row["embed"] = embed_report
+            if "store" in args.stages:
+                query_vectors = EmbeddingService(cache_path=None, model=embedder).embed(queries[:args.queries])
+                row["store"] = bench_store(vectors, chunks, query_vectors, args.index_types, args.top_k)
+        if "pipeline" in args.stages:
+            row["pipeline"] = bench_pipeline(text, queries, args.pipeline_runs)
+        results.append(row)
+
+    report = {"environment": environment(), "config": vars(args), "results": results}
+    if "mmap" in args.stages:
+        report["mmap"] = bench_mmap(models.embedding_dimension())
+        if not report["mmap"].get("shared", True):
+            print("[bench] WARNING: loading with mmap=True copied the vectors into private memory", file=sys.stderr)
+    payload = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(payload + "\n")
+    else:
+        print(payload)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+"""Deterministic synthetic documents for the benchmark suite."""
+import textwrap
+
+import numpy as np
+
+WORDS_PER_PAGE = 350
+PAGES_PER_SECTION = 3
+
+def make_vocabulary(size=2000, seed=0):
+    rng = np.random.default_rng(seed)
+    syllables = ["ka", "lo", "mi", "ne", "ru", "sa", "ti", "vo", "xe", "zu", "pra", "sel", "dor", "fin", "gal"]
+    words = set()
+    while len(words) < size:
+        words.add("".join(rng.choice(syllables, size=rng.integers(2, 5))))
+    return sorted(words)
+
+def make_pages(page_count, seed=0, words_per_page=WORDS_PER_PAGE):
+    """
+    Return `page_count` pages of pseudo-text.
+
+    Word frequencies follow a Zipf-like distribution, sentences are 8-20 words long and
+    every few pages start a new all-caps section header, so chunkers and the lexical
+    index see realistic structure. The same seed always yields the same corpus.
+    """
+    rng = np.random.default_rng(seed)
+    vocabulary = make_vocabulary(seed=seed)
+    weights = 1.0 / np.arange(1, len(vocabulary) + 1)
+    weights /= weights.sum()
+
+    pages = []
+    for page_no in range(page_count):
+        words = rng.choice(vocabulary, size=words_per_page, p=weights)
+        sentences, position = [], 0
+        while position < len(words):
+            length = int(rng.integers(8, 21))
+            sentence = " ".join(words[position:position + length])
+            sentences.append(sentence[0].upper() + sentence[1:] + ".")
+            position += length
+        paragraphs = [" ".join(sentences[i:i + 5]) for i in range(0, len(sentences), 5)]
+        if page_no % PAGES_PER_SECTION == 0:
+            paragraphs.insert(0, f"SECTION {page_no // PAGES_PER_SECTION + 1} {vocabulary[page_no % len(vocabulary)].upper()}")
+        pages.append("\n".join(paragraphs))
+    return pages
+
+def make_queries(pages, count, seed=0):
+    """Pick `count` sentences from the corpus as queries."""
+    rng = np.random.default_rng(seed + 1)
+    queries = []
+    for page_no in rng.integers(0, len(pages), size=count):
+        sentences = [s for s in pages[page_no].replace("\n", " ").split(". ") if len(s.split()) >= 6]
+        queries.append(sentences[int(rng.integers(0, len(sentences)))] if sentences else pages[page_no][:200])
+    return queries
+
+def _escape(line):
+    return line.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+
+def make_pdf(pages):
+    """
+    Build a minimal PDF with one page per text page (Helvetica, ASCII text only).
+
+    Hand-written so the suite needs no PDF-writing dependency; PyPDF2 extracts the
+    text back line by line.
+    """
+    objects = [b"<< /Type /Catalog /Pages 2 0 R >>"]
+    kids = [4 + 2 * i for i in range(len(pages))]
+    objects.append(f"<< /Type /Pages /Kids [{' '.join(f'{kid} 0 R' for kid in kids)}] /Count {len(pages)} >>".encode())
+    objects.append(b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>")
+    for kid, text in zip(kids, pages):
+        lines = [line for paragraph in text.split("\n") for line in textwrap.wrap(paragraph, 100)]
+        content = "BT /F1 9 Tf 11 TL 40 810 Td " + " ".join(f"({_escape(line)}) '" for line in lines) + " ET"
+        objects.append(
+            f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 595 842] "
+            f"/Resources << /Font << /F1 3 0 R >> >> /Contents {kid + 1} 0 R >>".encode()
+        )
+        objects.append(f"<< /Length {len(content)} >>\nstream\n{content}\nendstream".encode())
+
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(len(out))
+        out += f"{number} 0 obj\n".encode() + body + b"\nendobj\n"
+    xref = len(out)
+    out += f"xref\n0 {len(objects) + 1}\n0000000000 65535 f \n".encode()
+    out += b"".join(f"{offset:010d} 00000 n \n".encode() for offset in offsets)
+    out += f"trailer\n<< /Size {len(objects) + 1} /Root 1 0 R >>\nstartxref\n{xref}\n%%EOF\n".encode()
+    return bytes(out)
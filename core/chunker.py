@@ -1,50 +1,139 @@
-from langchain_text_splitters import RecursiveCharacterTextSplitter
-
-def chunk_text(text, chunk_size=10000, chunk_overlap=1000):
-    # First split by major sections (headers in all caps)
-    sections = []
-    current_section = []
-    
-    for line in text.split('\n'):
-        stripped = line.strip()
-        if stripped and stripped.isupper() and len(stripped) > 3:  # Section header
-            if current_section:
-                sections.append('\n'.join(current_section))
-                current_section = []
-        current_section.append(line)
-    
-    if current_section:
-        sections.append('\n'.join(current_section))
-    
-    # Special handling for fiscal policy document structure
-    if "Fiscal Policy" in text:
-        # Merge small related sections
-        merged_sections = []
-        current_merge = []
-        for section in sections:
-            if any(header in section for header in ["Definition", "Importance", "Objectives"]):
-                if current_merge:
-                    merged_sections.append('\n'.join(current_merge))
-                    current_merge = []
-            current_merge.append(section)
-        if current_merge:
-            merged_sections.append('\n'.join(current_merge))
-        sections = merged_sections
-    
-    # Then split large sections into smaller chunks
-    text_splitter = RecursiveCharacterTextSplitter(
-        chunk_size=chunk_size,
-        chunk_overlap=chunk_overlap,
-        length_function=len,
-        keep_separator=True
-    )
-    
-    chunks = []
-    for section in sections:
-        if len(section) > chunk_size:
-            sub_chunks = text_splitter.split_text(section)
-            chunks.extend(sub_chunks)
-        else:
-            chunks.append(section)
-    
-    return chunks
\ No newline at end of file
+import os
+import re
+from collections import deque
+from functools import lru_cache
+from itertools import islice
+
+from core.telemetry import traced
+from core.tokens import count_tokens
+
+# Sizes are in tokens. all-MiniLM-L6-v2 truncates its input at 256 word pieces, and
+# word pieces run a little longer than the budget counter's tokens, so stay below that
+CHUNK_SIZE = int(os.environ.get("ASKYOURDOCSX_CHUNK_TOKENS", "200"))
+CHUNK_OVERLAP = int(os.environ.get("ASKYOURDOCSX_CHUNK_OVERLAP_TOKENS", "32"))
+
+# "header": sentences packed into chunks that break at section headers
+# "sentence": sentences packed into chunks regardless of structure
+# "sliding": a fixed window of words with overlap
+CHUNK_STRATEGIES = ("header", "sentence", "sliding")
+CHUNK_STRATEGY = os.environ.get("ASKYOURDOCSX_CHUNK_STRATEGY", "header")
+
+# Longer caps lines are body text (disclaimers, liability caps), not headers
+MAX_HEADER_WORDS = 20
+
+_SENTENCE = re.compile(r"\S.*?(?:[.!?](?=\s|$)|$)")
+_WORD = re.compile(r"\S+")
+
+@lru_cache(maxsize=65536)
+def _unit_tokens(text):
+    # Words and short sentences repeat a lot, so each distinct one is only counted once
+    return count_tokens(text)
+
+def _is_section_header(line):
+    stripped = line.strip()
+    if len(stripped.split()) > MAX_HEADER_WORDS:
+        return False
+    if stripped.startswith("#"):
+        return len(stripped.lstrip("#").strip()) > 0
+    return bool(stripped) and stripped.isupper() and len(stripped) > 3
+
+def _units(pages, pattern, max_tokens):
+    """
+    Yield (text, separator, tokens, page, offset, is_header) for every sentence or word.
+
+    Header lines that fit in `max_tokens` are kept whole. A sentence longer than
+    `max_tokens` is broken into words so that no single unit can overflow a chunk.
+    """
+    for page_no, text in pages:
+        offset = 0
+        for line in text.split('\n'):
+            header = line.strip()
+            if _is_section_header(line) and _unit_tokens(header) <= max_tokens:
+                yield header, '\n', _unit_tokens(header), page_no, offset + line.index(header[0]), True
+            else:
+                separator = '\n'
+                for match in pattern.finditer(line):
+                    unit, tokens = match.group(), _unit_tokens(match.group())
+                    if tokens > max_tokens and pattern is not _WORD:
+                        for word in _WORD.finditer(unit):
+                            yield word.group(), separator, _unit_tokens(word.group()), page_no, offset + match.start() + word.start(), False
+                            separator = ' '
+                    else:
+                        yield unit, separator, tokens, page_no, offset + match.start(), False
+                    separator = ' '
+            offset += len(line) + 1
+
+def chunk_pages(pages, chunk_size=CHUNK_SIZE, chunk_overlap=CHUNK_OVERLAP, strategy=CHUNK_STRATEGY):
+    """
+    Chunk (page_no, text) records in a single streaming pass.
+
+    Text is cut into sentences (or words for "sliding") whose tokens are counted once,
+    then packed greedily into chunks of at most `chunk_size` tokens. Each chunk starts
+    with up to `chunk_overlap` tokens carried over from the end of the previous one.
+    With the "header" strategy a section header closes the current chunk (unless it is
+    still small, so short sections merge with the next one) and no overlap crosses it.
+    Only the chunk being built is held in memory.
+
+    Args:
+        pages (iterable): (page_no, text) records; page_no may be None for plain text.
+        chunk_size (int): Maximum tokens per chunk.
+        chunk_overlap (int): Maximum tokens repeated from the previous chunk.
+        strategy (str): One of CHUNK_STRATEGIES.
+
+    Yields:
+        dict: The chunk "text", its "tokens", the "page" and character "offset" within
+        that page where it starts, and with the "header" strategy its "section".
+    """
+    if strategy not in CHUNK_STRATEGIES:
+        raise ValueError(f"Unknown chunking strategy '{strategy}'. Expected one of {CHUNK_STRATEGIES}")
+    pattern = _WORD if strategy == "sliding" else _SENTENCE
+    by_header = strategy == "header"
+    min_section_tokens = chunk_size // 4
+
+    window = deque()  # (text, separator, tokens, page, offset, section) of the chunk being built
+    tokens = 0
+    fresh = False  # Whether the window holds units not yet emitted in a chunk
+    section = None
+
+    def emit():
+        first = window[0]
+        text = first[0] + "".join(separator + unit for unit, separator, *_ in islice(window, 1, None))
+        record = {"text": text, "tokens": tokens, "page": first[3], "offset": first[4]}
+        if by_header:
+            record["section"] = first[5]
+        return record
+
+    for text, separator, unit_tokens, page, offset, is_header in _units(pages, pattern, chunk_size):
+        if by_header and is_header:
+            if fresh and tokens >= min_section_tokens:
+                yield emit()
+                window.clear()
+                tokens, fresh = 0, False
+            elif not fresh:
+                window.clear()  # Overlap never crosses into a new section
+                tokens = 0
+            section = text
+
+        if fresh and tokens + unit_tokens > chunk_size:
+            yield emit()
+            fresh = False
+            # Keep the trailing units that fit into the overlap for the next chunk
+            kept, carried = 0, 0
+            for unit in reversed(window):
+                if carried + unit[2] > chunk_overlap:
+                    break
+                carried += unit[2]
+                kept += 1
+            while len(window) > kept or (window and tokens + unit_tokens > chunk_size):
+                tokens -= window.popleft()[2]
+
+        window.append((text, separator, unit_tokens, page, offset, section))
+        tokens += unit_tokens
+        fresh = True
+
+    if fresh:
+        yield emit()
+
+@traced("chunk")
+def chunk_text(text, chunk_size=CHUNK_SIZE, chunk_overlap=CHUNK_OVERLAP, strategy=CHUNK_STRATEGY):
+    return [record["text"] for record in chunk_pages([(None, text)], chunk_size, chunk_overlap, strategy)]
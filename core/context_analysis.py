@@ -0,0 +1,99 @@
+import re
+import threading
+from collections import OrderedDict
+
+# Document-level context (people, places, themes, size) computed once per document at
+# ingest and merged at question time; used by the ContextMiner agent.
+
+PEOPLE = re.compile(r'\b[A-Z][a-z]+ [A-Z][a-z]+\b')
+LOCATIONS = re.compile(r'\b(?:Point|Island|Harbor|Bay|City|Town|Street|Avenue)\s+[A-Z][a-z]+\b|[A-Z][a-z]+\s+(?:Point|Island|Harbor|Bay|City|Town)\b')
+SENTENCE_BREAK = re.compile(r'[.!?]+')
+
+THEME_KEYWORDS = {
+    'lighthouse': ['lighthouse', 'beacon', 'light', 'keeper', 'warning'],
+    'maritime': ['ship', 'ocean', 'sea', 'waves', 'storm', 'rocks'],
+    'solitude': ['alone', 'solitude', 'lonely', 'isolated', 'quiet'],
+    'time': ['years', 'decades', 'time', 'aging', 'old'],
+    'nature': ['stars', 'wind', 'weather', 'dawn', 'dusk']
+}
+_KEYWORD_THEMES = {keyword: theme for theme, keywords in THEME_KEYWORDS.items() for keyword in keywords}
+# All theme keywords in one case-insensitive pattern, matched as substrings at every
+# position (the lookahead allows overlaps), so one scan finds every theme
+THEME_PATTERN = re.compile(
+    "(?=(" + "|".join(re.escape(keyword) for keyword in sorted(_KEYWORD_THEMES, key=len, reverse=True)) + "))",
+    re.IGNORECASE
+)
+
+CACHE_SIZE = 256  # Per-document analyses kept in memory
+
+_cache = OrderedDict()
+_cache_lock = threading.Lock()
+
+def analyze(pages):
+    """
+    Analyse a document page by page, without joining its pages into one string.
+
+    Each page is scanned once per statistic: the people, location and theme patterns,
+    the sentence-break pattern and str.split() for the word count. Each of these runs
+    in C; folding the two counts into one alternation regex measured about 3x slower.
+
+    Args:
+        pages (iterable): Page texts, or (page_no, text) records.
+
+    Returns:
+        dict: "people" and "locations" (in order of first appearance), "themes",
+        "sentence_breaks" (runs of . ! ?) and "words".
+    """
+    people, locations, themes = {}, {}, set()
+    sentence_breaks = words = 0
+    for page in pages:
+        text = page[1] if isinstance(page, tuple) else page
+        people.update(dict.fromkeys(PEOPLE.findall(text)))
+        locations.update(dict.fromkeys(LOCATIONS.findall(text)))
+        if len(themes) < len(THEME_KEYWORDS):
+            for match in THEME_PATTERN.finditer(text):
+                themes.add(_KEYWORD_THEMES[match.group(1).lower()])
+                if len(themes) == len(THEME_KEYWORDS):
+                    break  # Every theme found; the rest of the text cannot add one
+        sentence_breaks += sum(1 for _ in SENTENCE_BREAK.finditer(text))
+        words += len(text.split())
+    return {
+        "people": list(people),
+        "locations": list(locations),
+        "themes": [theme for theme in THEME_KEYWORDS if theme in themes],
+        "sentence_breaks": sentence_breaks,
+        "words": words,
+    }
+
+def analyze_document(pages, key=None):
+    """analyze() with a per-document cache; `key` should identify the content, e.g. its hash."""
+    if key is not None:
+        with _cache_lock:
+            if key in _cache:
+                _cache.move_to_end(key)
+                return _cache[key]
+    analysis = analyze(pages)
+    if key is not None:
+        with _cache_lock:
+            _cache[key] = analysis
+            while len(_cache) > CACHE_SIZE:
+                _cache.popitem(last=False)
+    return analysis
+
+def merge(analyses):
+    """Combine per-document analyses into one for the whole document set."""
+    people, locations, themes = {}, {}, set()
+    sentence_breaks = words = 0
+    for analysis in analyses:
+        people.update(dict.fromkeys(analysis["people"]))
+        locations.update(dict.fromkeys(analysis["locations"]))
+        themes.update(analysis["themes"])
+        sentence_breaks += analysis["sentence_breaks"]
+        words += analysis["words"]
+    return {
+        "people": list(people),
+        "locations": list(locations),
+        "themes": [theme for theme in THEME_KEYWORDS if theme in themes],
+        "sentence_breaks": sentence_breaks,
+        "words": words,
+    }
@@ -0,0 +1,119 @@
+import hashlib
+import os
+import re
+import zlib
+
+import numpy as np
+
+# Near-duplicate detection for chunks: several versions of one contract or resume produce
+# chunks that repeat each other exactly or almost word for word. Exact copies are found by
+# a hash of the normalized text; near copies by MinHash signatures over word shingles,
+# with locality-sensitive hashing (LSH) so only likely matches are compared. A near copy
+# is stored as its first version's text, so near matching is opt-in: two versions that
+# differ only in a figure would otherwise keep just one of the figures.
+
+# Estimated Jaccard similarity of word shingles at which a chunk counts as a near duplicate
+DEDUP_THRESHOLD = float(os.environ.get("ASKYOURDOCSX_DEDUP_THRESHOLD", "0.85"))
+SHINGLE_SIZE = 3  # Words per shingle
+NUM_PERM = 128    # MinHash signature length
+BANDS = 32        # LSH bands of NUM_PERM // BANDS rows; candidates share at least one band
+
+_WORD = re.compile(r"\w+")
+_PRIME = 4294967291  # Largest prime below 2**32, so (a * h + b) fits in uint64
+
+def words(text):
+    return _WORD.findall(text.lower())
+
+class MinHasher:
+    def __init__(self, num_perm=NUM_PERM, shingle_size=SHINGLE_SIZE, seed=1):
+        rng = np.random.default_rng(seed)
+        self.a = rng.integers(1, _PRIME, num_perm, dtype=np.uint64)
+        self.b = rng.integers(0, _PRIME, num_perm, dtype=np.uint64)
+        self.shingle_size = shingle_size
+
+    def signature(self, tokens):
+        """MinHash signature of the word shingles of `tokens`."""
+        size = self.shingle_size
+        shingles = {" ".join(tokens[i:i + size]) for i in range(max(len(tokens) - size + 1, 1))}
+        hashes = np.array([zlib.crc32(shingle.encode("utf-8")) for shingle in shingles], dtype=np.uint64)
+        return ((np.outer(hashes, self.a) + self.b) % _PRIME).min(axis=0)
+
+class Deduplicator:
+    """
+    Index of chunk fingerprints that finds exact and near copies of indexed chunks.
+
+    Keys are whatever the caller uses to identify a chunk, e.g. its chunk ID. With
+    near=False only exact copies are found and no MinHash signatures are computed.
+    """
+
+    def __init__(self, near=False, threshold=DEDUP_THRESHOLD, num_perm=NUM_PERM, bands=BANDS, shingle_size=SHINGLE_SIZE):
+        if num_perm % bands:
+            raise ValueError(f"bands={bands} must divide num_perm={num_perm}")
+        self.near = near
+        self.threshold = threshold
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.hasher = MinHasher(num_perm, shingle_size)
+        self.exact = {}    # normalized text hash -> key
+        self.buckets = {}  # (band, band signature) -> keys
+        self.entries = {}  # key -> (text hash, signature)
+
+    def fingerprint(self, text):
+        tokens = words(text)
+        digest = hashlib.blake2b(" ".join(tokens).encode("utf-8"), digest_size=16).digest()
+        return digest, self.hasher.signature(tokens) if self.near else None
+
+    def _bands(self, signature):
+        if signature is None:
+            return
+        for band in range(self.bands):
+            yield band, signature[band * self.rows:(band + 1) * self.rows].tobytes()
+
+    def find(self, fingerprint):
+        """
+        Find an indexed chunk that `fingerprint` duplicates.
+
+        Returns:
+            tuple: (key, "exact" or "near") for the best match, or None.
+        """
+        digest, signature = fingerprint
+        key = self.exact.get(digest)
+        if key is not None:
+            return key, "exact"
+        candidates = set()
+        for bucket in self._bands(signature):
+            candidates.update(self.buckets.get(bucket, ()))
+        best, best_score = None, self.threshold
+        for key in candidates:
+            # The share of equal MinHash values estimates the Jaccard similarity
+            score = float(np.mean(self.entries[key][1] == signature))
+            if score >= best_score:
+                best, best_score = key, score
+        return (best, "near") if best is not None else None
+
+    def add(self, key, fingerprint):
+        digest, signature = fingerprint
+        self.entries[key] = fingerprint
+        self.exact.setdefault(digest, key)
+        for bucket in self._bands(signature):
+            self.buckets.setdefault(bucket, set()).add(key)
+
+    def remove(self, key):
+        fingerprint = self.entries.pop(key, None)
+        if fingerprint is None:
+            return
+        digest, signature = fingerprint
+        if self.exact.get(digest) == key:
+            del self.exact[digest]
+        for bucket in self._bands(signature):
+            keys = self.buckets.get(bucket)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self.buckets[bucket]
+
+    def rename(self, key, new_key):
+        fingerprint = self.entries.get(key)
+        if fingerprint is not None:
+            self.remove(key)
+            self.add(new_key, fingerprint)
@@ -1,10 +1,161 @@
-from sentence_transformers import SentenceTransformer
+import hashlib
+import os
+import sqlite3
+import threading
+from collections import OrderedDict
 
-model = SentenceTransformer("all-MiniLM-L6-v2")
+import numpy as np
 
-def embed_chunks(chunks):
-    return model.encode(
-        chunks,
-        show_progress_bar=True,
-        # convert_to_tensor=True
-    )
+from core.models import get_embedder, embedder_id, embedding_dimension
+from core.telemetry import span
+
+BATCH_SIZE = int(os.environ.get("ASKYOURDOCSX_EMBED_BATCH_SIZE", "64"))
+CACHE_SIZE = 100000  # Vectors kept in memory (~150 MB for 384-d float32)
+# Set ASKYOURDOCSX_EMBED_CACHE to a file path to persist vectors across restarts
+CACHE_PATH = os.environ.get("ASKYOURDOCSX_EMBED_CACHE")
+# Encode with one process per CPU core once a single call has at least this many new texts; 0 disables it
+POOL_THRESHOLD = int(os.environ.get("ASKYOURDOCSX_EMBED_POOL_THRESHOLD", "0"))
+
+class DiskVectorCache:
+    """On-disk embedding cache in SQLite, storing vectors as float16 or float32 blobs."""
+
+    def __init__(self, path, dtype="float16"):
+        self.dtype = np.dtype(dtype)
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.lock = threading.Lock()
+        with self.lock, self.conn:
+            self.conn.execute("CREATE TABLE IF NOT EXISTS vectors (key TEXT PRIMARY KEY, vector BLOB NOT NULL)")
+
+    def get_many(self, keys):
+        found = {}
+        with self.lock:
+            for start in range(0, len(keys), 500):  # Stay below SQLite's parameter limit
+                batch = keys[start:start + 500]
+                rows = self.conn.execute(
+                    f"SELECT key, vector FROM vectors WHERE key IN ({','.join('?' * len(batch))})", batch
+                ).fetchall()
+                for key, blob in rows:
+                    found[key] = np.frombuffer(blob, dtype=self.dtype).astype("float32")
+        return found
+
+    def set_many(self, items):
+        with self.lock, self.conn:
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO vectors (key, vector) VALUES (?, ?)",
+                [(key, vector.astype(self.dtype).tobytes()) for key, vector in items],
+            )
+
+class EmbeddingService:
+    """
+    Batched sentence encoder with a content-hash keyed vector cache.
+
+    Texts are looked up in an in-memory LRU cache, then in the optional on-disk
+    store; only unseen texts reach the model. Those are sorted by length before
+    batching so each batch pads to similar lengths, and the output is always a
+    contiguous float32 matrix, L2-normalized by default, ready for FAISS.
+    """
+
+    def __init__(self, batch_size=BATCH_SIZE, cache_size=CACHE_SIZE, cache_path=CACHE_PATH,
+                 cache_dtype="float16", normalize=True, pool_threshold=POOL_THRESHOLD, model=None, model_id=None):
+        self.batch_size = batch_size
+        self.cache_size = cache_size
+        self.disk_cache = DiskVectorCache(cache_path, cache_dtype) if cache_path else None
+        self.normalize = normalize
+        self.pool_threshold = pool_threshold
+        # An explicit model (e.g. another backend) bypasses the shared registry embedder
+        self.model = model
+        self.model_id = model_id or embedder_id()
+        self.memory_cache = OrderedDict()
+        self.lock = threading.Lock()
+        self.pool = None
+        self.hits = 0
+        self.misses = 0
+
+    def _key(self, text):
+        # The model name is part of the key so switching models never returns stale vectors
+        return hashlib.sha1(f"{self.model_id}\0{text}".encode("utf-8")).hexdigest()
+
+    def _remember(self, key, vector):
+        with self.lock:
+            self.memory_cache[key] = vector
+            self.memory_cache.move_to_end(key)
+            while len(self.memory_cache) > self.cache_size:
+                self.memory_cache.popitem(last=False)
+
+    def _encode(self, texts, show_progress_bar):
+        model = self.model or get_embedder()
+        # Longest first, so every batch holds texts of similar length and pads little
+        order = sorted(range(len(texts)), key=lambda i: len(texts[i]), reverse=True)
+        sorted_texts = [texts[i] for i in order]
+
+        if self.pool_threshold and len(texts) >= self.pool_threshold:
+            if self.pool is None:
+                self.pool = model.start_multi_process_pool()
+            vectors = model.encode_multi_process(sorted_texts, self.pool, batch_size=self.batch_size)
+        else:
+            vectors = model.encode(sorted_texts, batch_size=self.batch_size, show_progress_bar=show_progress_bar)
+
+        result = np.empty_like(vectors, dtype="float32")
+        result[order] = vectors
+        return result
+
+    def embed(self, texts, show_progress_bar=False):
+        if isinstance(texts, str):
+            texts = [texts]
+        keys = [self._key(text) for text in texts]
+        vectors = [None] * len(texts)
+
+        missing = {}  # key -> positions still without a vector
+        with self.lock:
+            for i, key in enumerate(keys):
+                vector = self.memory_cache.get(key)
+                if vector is not None:
+                    self.memory_cache.move_to_end(key)
+                    vectors[i] = vector
+                else:
+                    missing.setdefault(key, []).append(i)
+
+        if missing and self.disk_cache is not None:
+            for key, vector in self.disk_cache.get_many(list(missing)).items():
+                self._remember(key, vector)
+                for i in missing.pop(key):
+                    vectors[i] = vector
+
+        self.hits += len(texts) - sum(len(positions) for positions in missing.values())
+        self.misses += len(missing)
+        if missing:
+            # Encode each distinct unseen text once
+            new_keys = list(missing)
+            encoded = self._encode([texts[missing[key][0]] for key in new_keys], show_progress_bar)
+            if self.normalize:
+                norms = np.linalg.norm(encoded, axis=1, keepdims=True)
+                encoded = encoded / np.where(norms == 0, 1, norms)
+            for key, vector in zip(new_keys, encoded):
+                self._remember(key, vector)
+                for i in missing[key]:
+                    vectors[i] = vector
+            if self.disk_cache is not None:
+                self.disk_cache.set_many(zip(new_keys, encoded))
+
+        if not vectors:
+            return np.empty((0, embedding_dimension()), dtype="float32")
+        return np.ascontiguousarray(np.vstack(vectors), dtype="float32")
+
+    def stats(self):
+        return {"hits": self.hits, "misses": self.misses, "cached": len(self.memory_cache)}
+
+    def close(self):
+        if self.pool is not None:
+            (self.model or get_embedder()).stop_multi_process_pool(self.pool)
+            self.pool = None
+
+embedding_service = EmbeddingService()
+
+def embed_chunks(chunks, show_progress_bar=True):
+    # The model is loaded on first use rather than at import time
+    with span("embed", texts=1 if isinstance(chunks, str) else len(chunks)) as current:
+        misses = embedding_service.misses
+        vectors = embedding_service.embed(chunks, show_progress_bar=show_progress_bar)
+        current.set(encoded=embedding_service.misses - misses)
+    return vectors
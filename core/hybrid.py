@@ -0,0 +1,118 @@
+import heapq
+import math
+import re
+from collections import Counter
+
+from core.models import get_reranker
+from core.telemetry import span
+
+# Lexical retrieval and result fusion used alongside the dense FAISS search
+
+_TOKEN = re.compile(r"\w+")
+
+def tokenize(text):
+    return _TOKEN.findall(text.lower())
+
+class BM25Index:
+    """
+    Incremental inverted index scored with Okapi BM25.
+
+    Postings map each term to {chunk ID: term frequency}, so adding or removing a
+    document only touches its own terms, and a query only visits the postings of the
+    terms it contains. IDF and the average length are computed at query time.
+    """
+
+    def __init__(self, k1=1.5, b=0.75):
+        self.k1 = k1
+        self.b = b
+        self.postings = {}   # term -> {chunk ID: term frequency}
+        self.lengths = {}    # chunk ID -> number of tokens
+        self.total_length = 0
+
+    def __len__(self):
+        return len(self.lengths)
+
+    def add(self, chunk_ids, texts):
+        for chunk_id, text in zip(chunk_ids, texts):
+            terms = tokenize(text)
+            self.lengths[chunk_id] = len(terms)
+            self.total_length += len(terms)
+            for term, frequency in Counter(terms).items():
+                self.postings.setdefault(term, {})[chunk_id] = frequency
+
+    def remove(self, chunk_ids, texts):
+        for chunk_id, text in zip(chunk_ids, texts):
+            self.total_length -= self.lengths.pop(chunk_id, 0)
+            for term in set(tokenize(text)):
+                postings = self.postings.get(term)
+                if postings is not None:
+                    postings.pop(chunk_id, None)
+                    if not postings:
+                        del self.postings[term]
+
+    def matching(self, text):
+        """Chunk IDs that contain every term of `text`."""
+        ids = None
+        for term in sorted(set(tokenize(text)), key=lambda term: len(self.postings.get(term, ()))):
+            postings = self.postings.get(term, {})
+            ids = set(postings) if ids is None else ids & postings.keys()
+            if not ids:
+                return set()
+        return ids or set()
+
+    def search(self, query, top_k=5, allowed=None):
+        """Return up to `top_k` (chunk ID, score) pairs, best first, optionally only from `allowed` IDs."""
+        if not self.lengths:
+            return []
+        count = len(self.lengths)
+        average_length = self.total_length / count or 1
+        scores = {}
+        for term in set(tokenize(query)):
+            postings = self.postings.get(term)
+            if not postings:
+                continue
+            idf = math.log(1 + (count - len(postings) + 0.5) / (len(postings) + 0.5))
+            for chunk_id, frequency in postings.items():
+                if allowed is not None and chunk_id not in allowed:
+                    continue
+                norm = self.k1 * (1 - self.b + self.b * self.lengths[chunk_id] / average_length)
+                scores[chunk_id] = scores.get(chunk_id, 0.0) + idf * frequency * (self.k1 + 1) / (frequency + norm)
+        return heapq.nlargest(top_k, scores.items(), key=lambda item: item[1])
+
+def reciprocal_rank_fusion(rankings, k=60, top_k=None):
+    """
+    Merge several ranked lists of IDs with Reciprocal Rank Fusion.
+
+    Each list contributes 1 / (k + rank) for every ID it contains, so an ID ranked
+    well by both retrievers beats one ranked first by only one of them. Scores from
+    the individual retrievers are ignored, which makes BM25 and vector distances
+    comparable without any calibration.
+
+    Returns:
+        list: (ID, fused score) pairs, best first.
+    """
+    fused = {}
+    for ranking in rankings:
+        for rank, item_id in enumerate(ranking, start=1):
+            fused[item_id] = fused.get(item_id, 0.0) + 1.0 / (k + rank)
+    ordered = sorted(fused.items(), key=lambda item: item[1], reverse=True)
+    return ordered[:top_k] if top_k is not None else ordered
+
+def rerank(questions, candidates, top_k):
+    """
+    Reorder each question's candidate results with the cross-encoder.
+
+    All (question, chunk) pairs of the batch are scored in one predict call. Each
+    result dict gains a "rerank_score" and only the best `top_k` are kept.
+    """
+    pairs = [(question, result["text"]) for question, results in zip(questions, candidates) for result in results]
+    if not pairs:
+        return candidates
+    with span("rerank", pairs=len(pairs)):
+        scores = iter(get_reranker().predict(pairs, show_progress_bar=False).tolist())
+    reranked = []
+    for results in candidates:
+        for result in results:
+            result["rerank_score"] = next(scores)
+        reranked.append(sorted(results, key=lambda result: result["rerank_score"], reverse=True)[:top_k])
+    return reranked
@@ -1,23 +1,113 @@
-import pytesseract
-import cv2
+import hashlib
 import os
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 
-# Set tesseract executable path
-pytesseract.pytesseract.tesseract_cmd = r"C:\Program Files\Tesseract-OCR\tesseract.exe"
+import cv2
+import numpy as np
+import pytesseract
 
-def ocr_from_image(image_path):
-    img = cv2.imread(image_path)
+# Set tesseract executable path: $TESSERACT_CMD, else the default Windows install, else $PATH
+WINDOWS_TESSERACT = r"C:\Program Files\Tesseract-OCR\tesseract.exe"
+if os.environ.get("TESSERACT_CMD"):
+    pytesseract.pytesseract.tesseract_cmd = os.environ["TESSERACT_CMD"]
+elif os.name == "nt" and os.path.exists(WINDOWS_TESSERACT):
+    pytesseract.pytesseract.tesseract_cmd = WINDOWS_TESSERACT
+
+OCR_CACHE_DIR = "data/ocr_cache"
+MEMORY_CACHE_SIZE = 1024  # OCR texts kept in memory; the rest are read back from OCR_CACHE_DIR
+
+_memory_cache = OrderedDict()
+_memory_cache_lock = threading.Lock()
+
+def ocr_workers():
+    # Read on each call: ingest worker processes set their share of the CPUs after import
+    return int(os.environ.get("ASKYOURDOCSX_OCR_WORKERS", os.cpu_count() or 1))
+
+def _cache_get(key):
+    with _memory_cache_lock:
+        text = _memory_cache.get(key)
+        if text is not None:
+            _memory_cache.move_to_end(key)
+        return text
+
+def _cache_put(key, text):
+    with _memory_cache_lock:
+        _memory_cache[key] = text
+        _memory_cache.move_to_end(key)
+        while len(_memory_cache) > MEMORY_CACHE_SIZE:
+            _memory_cache.popitem(last=False)
 
+def _preprocess(img):
     # Optional preprocessing to improve OCR accuracy
     gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
-    gray = cv2.threshold(gray, 150, 255, cv2.THRESH_BINARY | cv2.THRESH_OTSU)[1]
+    return cv2.threshold(gray, 150, 255, cv2.THRESH_BINARY | cv2.THRESH_OTSU)[1]
 
+def _run_tesseract(img):
     # Preserve layout: --psm 1 + --oem 3 + layout
     custom_config = r'--oem 3 --psm 1'
-    text = pytesseract.image_to_string(gray, config=custom_config)
-
+    text = pytesseract.image_to_string(_preprocess(img), config=custom_config)
     return text.strip()
 
+def ocr_from_bytes(data, use_cache=True):
+    """
+    OCR an encoded image (PNG, JPEG, ...) straight from memory.
+
+    Results are cached by the SHA-256 of the image bytes, in memory (the most recent
+    MEMORY_CACHE_SIZE) and under data/ocr_cache, so the same image is only ever
+    recognised once.
+    """
+    key = hashlib.sha256(data).hexdigest()
+    cache_path = os.path.join(OCR_CACHE_DIR, f"{key}.txt")
+    if use_cache:
+        text = _cache_get(key)
+        if text is not None:
+            return text
+        if os.path.exists(cache_path):
+            with open(cache_path, "r", encoding="utf-8") as f:
+                text = f.read()
+            _cache_put(key, text)
+            return text
+
+    img = cv2.imdecode(np.frombuffer(data, dtype=np.uint8), cv2.IMREAD_COLOR)
+    if img is None:
+        raise ValueError("Could not decode image data.")
+    text = _run_tesseract(img)
+
+    if use_cache:
+        _cache_put(key, text)
+        os.makedirs(OCR_CACHE_DIR, exist_ok=True)
+        with open(cache_path + ".tmp", "w", encoding="utf-8") as f:
+            f.write(text)
+        os.replace(cache_path + ".tmp", cache_path)
+    return text
+
+def _ocr_or_empty(data):
+    try:
+        return ocr_from_bytes(data)
+    except ValueError:
+        return ""  # Image format OpenCV cannot decode
+
+def ocr_images(images, max_workers=None, skip_undecodable=False):
+    """
+    OCR many encoded images concurrently, returning their texts in input order.
+
+    Tesseract runs as a separate process per image, so a thread pool is enough to
+    keep several CPU cores busy. max_workers defaults to $ASKYOURDOCSX_OCR_WORKERS,
+    else the CPU count.
+    """
+    ocr = _ocr_or_empty if skip_undecodable else ocr_from_bytes
+    max_workers = max_workers or ocr_workers()
+    if len(images) <= 1 or max_workers <= 1:
+        return [ocr(data) for data in images]
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        return list(pool.map(ocr, images))
+
+def ocr_from_image(image_path):
+    with open(image_path, "rb") as f:
+        return ocr_from_bytes(f.read())
+
 def save_image_text(text, image_filename):
     filename = os.path.splitext(os.path.basename(image_filename))[0]
     output_path = f"data/processed_text/{filename}_ocr.txt"
@@ -0,0 +1,45 @@
+import hashlib
+import json
+import os
+
+from core.chunker import CHUNK_SIZE, CHUNK_OVERLAP, CHUNK_STRATEGY
+from core.models import embedder_id
+from core.vectorstore import FaissVectorStore, STORE_FORMAT
+
+CACHE_DIR = "data/index_cache"
+
+def content_hash(data):
+    """SHA-256 of a source document's raw bytes (str is hashed as UTF-8)."""
+    if isinstance(data, str):
+        data = data.encode("utf-8")
+    return hashlib.sha256(data).hexdigest()
+
+def config_fingerprint():
+    # Anything that changes the chunks or their vectors must invalidate cached indexes
+    return {
+        "chunk_size": CHUNK_SIZE,
+        "chunk_overlap": CHUNK_OVERLAP,
+        "chunk_strategy": CHUNK_STRATEGY,
+        "embedder": embedder_id(),
+        "store_format": STORE_FORMAT,
+    }
+
+def index_key(content_hashes):
+    """Cache key for an index built from documents with the given content hashes."""
+    if isinstance(content_hashes, str):
+        content_hashes = [content_hashes]
+    payload = json.dumps({"docs": sorted(content_hashes), "config": config_fingerprint()}, sort_keys=True)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+def index_path(key, cache_dir=CACHE_DIR):
+    return os.path.join(cache_dir, key)
+
+def load_index(key, mmap=False, cache_dir=CACHE_DIR):
+    """Return the cached FaissVectorStore for `key`, or None if it has not been built yet."""
+    path = index_path(key, cache_dir)
+    if not FaissVectorStore.exists(path):
+        return None
+    return FaissVectorStore.load(path, mmap=mmap)
+
+def save_index(key, store, cache_dir=CACHE_DIR):
+    store.save(index_path(key, cache_dir))
@@ -0,0 +1,143 @@
+import os
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from contextlib import nullcontext
+
+from core.pdfreader import parse_pages, count_pdf_pages, extract_pdf_range, PAGES_PER_TASK
+from core.index_cache import content_hash, index_key
+from core.telemetry import metrics, span
+
+# PDFs with at least this many pages are split into page ranges parsed by several workers
+PARALLEL_PAGE_THRESHOLD = 2 * PAGES_PER_TASK
+
+def parse_document(name, data):
+    """
+    Parse one uploaded file from memory. Runs in a worker process, so it must stay
+    importable and return only picklable values.
+    """
+    return parse_pages(data, name)
+
+def _init_worker(ocr_workers):
+    # Every worker may OCR scanned pages at once; split the CPUs between them rather than
+    # letting each start one tesseract per CPU. An explicit setting is kept.
+    os.environ.setdefault("ASKYOURDOCSX_OCR_WORKERS", str(ocr_workers))
+
+def _timed(fn, *args):
+    # Runs in the worker; spans do not cross processes, so the parse time travels with the result
+    started = time.perf_counter()
+    return fn(*args), time.perf_counter() - started
+
+def _plan_tasks(name, data, spool_path):
+    """
+    Split one file into (fn, args) units of parse work.
+
+    A PDF split into page ranges is written once to `spool_path`, and each task reads
+    its pages from there rather than being sent its own copy of the bytes.
+    """
+    if name.lower().endswith(".pdf"):
+        try:
+            page_count = count_pdf_pages(data)
+        except Exception:
+            page_count = 0  # Let the worker report the parse error
+        if page_count >= PARALLEL_PAGE_THRESHOLD:
+            with open(spool_path, "wb") as f:
+                f.write(data)
+            return [
+                (extract_pdf_range, (spool_path, start, min(start + PAGES_PER_TASK, page_count)))
+                for start in range(0, page_count, PAGES_PER_TASK)
+            ]
+    return [(parse_document, (name, data))]
+
+def ingest_documents(files, rag_chain, max_workers=None, on_document=None, lock=None):
+    """
+    Parse files in a process pool and index each one as soon as it is parsed.
+
+    PDF text extraction is CPU-bound pure Python, so worker processes (not threads)
+    parse the files in parallel while the calling process chunks and embeds the
+    documents that have already finished. Large PDFs are split into page ranges so a
+    single long document also uses every worker; they are spooled once to a temporary
+    file that the workers read their ranges from.
+
+    Args:
+        files (list): (name, bytes) pairs; each file is indexed under its name.
+        rag_chain (RAGChain): Index to add the documents to (existing ones are replaced).
+        max_workers (int, optional): Parser processes; defaults to the CPU count.
+            Each gets an equal share of the CPUs for OCR threads on scanned pages.
+        on_document (callable, optional): Called with each document's result dict
+            (name, text, pages, chunks, error, hash) once it has been indexed.
+        lock (callable, optional): Returns a context manager held around each index
+            update (not the parsing), e.g. the writer side of a lock shared with readers.
+
+    Returns:
+        dict: Per-stage totals and throughput (pages/s, chunks/s), plus how many of the
+        chunks duplicated an indexed chunk and were stored once ("duplicate_chunks",
+        "dedup_ratio").
+    """
+    stats = {"files": 0, "failed": 0, "pages": 0, "chunks": 0, "index_seconds": 0.0}
+    started = time.perf_counter()
+    if not files:
+        stats.update(wall_seconds=0.0, pages_per_second=0.0, chunks_per_second=0.0, duplicate_chunks=0, dedup_ratio=0.0)
+        return stats
+    duplicates_before = rag_chain.dedup_stats()["duplicates"]
+
+    hashes = {name: content_hash(data) for name, data in files}
+    records = {name: [] for name, _ in files}  # (page_no, text) records parsed so far
+    pending = {}  # name -> parse tasks not yet finished
+    failed = set()
+    cpus = os.cpu_count() or 1
+    max_workers = max_workers or cpus
+    with tempfile.TemporaryDirectory(prefix="askyourdocsx-ingest-") as spool_dir, \
+            ProcessPoolExecutor(max_workers=max_workers, initializer=_init_worker, initargs=(max(1, cpus // max_workers),)) as pool:
+        futures = {}
+        for i, (name, data) in enumerate(files):
+            tasks = _plan_tasks(name, data, os.path.join(spool_dir, f"{i}.pdf"))
+            pending[name] = len(tasks)
+            for fn, args in tasks:
+                futures[pool.submit(_timed, fn, *args)] = name
+
+        for future in as_completed(futures):
+            name = futures[future]
+            pending[name] -= 1
+            if name in failed:
+                continue  # Already reported; ignore the document's remaining page ranges
+
+            result = {"name": name, "hash": hashes[name], "text": "", "pages": 0, "chunks": 0, "error": None}
+            try:
+                parsed, parse_seconds = future.result()
+                records[name].extend(parsed)
+                metrics.observe("askyourdocsx_span_seconds", parse_seconds, span="parse")
+            except Exception as e:
+                result["error"] = str(e)
+                failed.add(name)
+            if result["error"] is None and pending[name]:
+                continue  # Wait for the document's other page ranges
+
+            pages = sorted(records.pop(name), key=lambda record: record[0])
+            if result["error"] is None:
+                result["pages"] = len(pages)
+                result["text"] = "".join(text for _, text in pages).strip()
+            if result["text"]:
+                index_start = time.perf_counter()
+                with span("index", document=name, pages=result["pages"]), (lock or nullcontext)():
+                    result["chunks"] = rag_chain.replace_document(
+                        name, result["text"], cache_key=index_key(result["hash"]), pages=pages
+                    )
+                stats["index_seconds"] += time.perf_counter() - index_start
+                stats["files"] += 1
+                stats["pages"] += result["pages"]
+                stats["chunks"] += result["chunks"]
+            elif result["error"] is not None:
+                stats["failed"] += 1
+
+            if on_document is not None:
+                on_document(result)
+
+    wall = time.perf_counter() - started
+    stats["wall_seconds"] = wall
+    # Parsing overlaps with indexing across processes, so page throughput uses wall-clock time
+    stats["pages_per_second"] = stats["pages"] / wall if wall else 0.0
+    stats["chunks_per_second"] = stats["chunks"] / stats["index_seconds"] if stats["index_seconds"] else 0.0
+    stats["duplicate_chunks"] = rag_chain.dedup_stats()["duplicates"] - duplicates_before
+    stats["dedup_ratio"] = stats["duplicate_chunks"] / stats["chunks"] if stats["chunks"] else 0.0
+    return stats
@@ -1,11 +1,64 @@
-from ollama import Client
+from core.models import LLM_MODEL
+from core.llm_gateway import gateway
+from core.llm_cache import response_cache
+from core.tokens import fit_to_budget, enforce_budget
+from core.telemetry import span, record_llm_usage
 
-client = Client()
+MODEL = LLM_MODEL
 
-def generate_answer(context_chunks, question):
-    context_text = "\n\n---\n\n".join(context_chunks)
+def stream_tokens(response, on_final=None):
+    """
+    Yield the text of each chunk of a streamed `client.chat(..., stream=True)` response.
 
-    prompt = f"""
+    `on_final` receives the last chunk, which carries Ollama's token counts and timings.
+    """
+    part = None
+    for part in response:
+        token = part["message"]["content"]
+        if token:
+            yield token
+    if on_final is not None and part is not None:
+        on_final(part)
+
+def _stream_and_cache(response, model, prompt, use_cache, agent):
+    # The span stays open until the caller has consumed the whole stream
+    with span("llm.chat", model=model, agent=agent, stream=True, cache="miss") as current:
+        tokens = []
+        for token in stream_tokens(response, on_final=lambda part: record_llm_usage(current, part, model)):
+            tokens.append(token)
+            yield token
+    # Only a fully consumed stream is a complete response worth caching
+    if use_cache:
+        response_cache.set(model, prompt, "".join(tokens))
+
+def chat(prompt, model=MODEL, stream=False, use_cache=True, agent="answer"):
+    """
+    Send a single-turn chat to Ollama through the shared response cache.
+
+    Returns the response text, or a generator of tokens when stream=True.
+    Identical model + prompt pairs are answered from the cache. Prompts over the
+    token budget are trimmed from the middle before they are sent. Requests go
+    through the LLM gateway, where `agent` selects the priority and reply limit.
+    """
+    prompt = enforce_budget(prompt)
+    if use_cache:
+        cached = response_cache.get(model, prompt)
+        if cached is not None:
+            with span("llm.chat", model=model, agent=agent, stream=stream, cache="hit"):
+                return iter([cached]) if stream else cached
+
+    if stream:
+        response = gateway.chat(model, [{"role": "user", "content": prompt}], agent=agent, stream=True)
+        return _stream_and_cache(response, model, prompt, use_cache, agent)
+    with span("llm.chat", model=model, agent=agent, stream=False, cache="miss") as current:
+        response = gateway.chat(model, [{"role": "user", "content": prompt}], agent=agent)
+        record_llm_usage(current, response, model)
+    content = response['message']['content']
+    if use_cache:
+        response_cache.set(model, prompt, content)
+    return content
+
+ANSWER_PROMPT = """
 You are an expert Assistant.
 
 Answer the question in a detailed, clear, and exam-ready manner using the context below. 
@@ -19,8 +72,14 @@ Question: {question}
 Answer:
 """
 
-    response = client.chat(
-        model="gemma:2b",
-        messages=[{"role": "user", "content": prompt}]
-    )
-    return response['message']['content']
+def generate_answer(context_chunks, question, stream=False):
+    # With stream=True, returns a generator of answer tokens instead of the full answer
+    # (the span then covers prompt building; the LLM time is in the llm.chat span)
+    with span("generate_answer", chunks=len(context_chunks), stream=stream):
+        context_text = "\n\n---\n\n".join(context_chunks)
+
+        # Leave room for the instructions and the question; retrieved context is trimmed first
+        context_text = fit_to_budget(context_text, ANSWER_PROMPT.format(context_text="", question=question))
+        prompt = ANSWER_PROMPT.format(context_text=context_text, question=question)
+
+        return chat(prompt, stream=stream)
@@ -0,0 +1,193 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+
+# Set ASKYOURDOCSX_LLM_CACHE to a file path to keep cached responses in SQLite across restarts
+CACHE_PATH = os.environ.get("ASKYOURDOCSX_LLM_CACHE")
+MAX_ENTRIES = 2048
+TTL_SECONDS = 24 * 3600
+
+class MemoryBackend:
+    """In-process key/value store with LRU and TTL eviction."""
+
+    def __init__(self, max_entries=MAX_ENTRIES, ttl=TTL_SECONDS):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.entries = OrderedDict()  # key -> (created, value)
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                return None
+            created, value = entry
+            if self.ttl is not None and time.time() - created > self.ttl:
+                del self.entries[key]
+                return None
+            self.entries.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        with self.lock:
+            self.entries[key] = (time.time(), value)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+    def __len__(self):
+        return len(self.entries)
+
+class SQLiteBackend:
+    """On-disk key/value store with LRU and TTL eviction; values are stored as JSON."""
+
+    def __init__(self, path, max_entries=MAX_ENTRIES, ttl=TTL_SECONDS):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.lock = threading.Lock()
+        with self.lock, self.conn:
+            self.conn.execute("PRAGMA journal_mode=WAL")
+            self.conn.execute(
+                "CREATE TABLE IF NOT EXISTS cache ("
+                "key TEXT PRIMARY KEY, value TEXT NOT NULL, created REAL NOT NULL, accessed REAL NOT NULL)"
+            )
+            self.conn.execute("CREATE INDEX IF NOT EXISTS cache_accessed ON cache (accessed)")
+
+    def get(self, key):
+        now = time.time()
+        with self.lock, self.conn:
+            row = self.conn.execute("SELECT value, created FROM cache WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return None
+            value, created = row
+            if self.ttl is not None and now - created > self.ttl:
+                self.conn.execute("DELETE FROM cache WHERE key = ?", (key,))
+                return None
+            self.conn.execute("UPDATE cache SET accessed = ? WHERE key = ?", (now, key))
+        return json.loads(value)
+
+    def set(self, key, value):
+        now = time.time()
+        with self.lock, self.conn:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO cache (key, value, created, accessed) VALUES (?, ?, ?, ?)",
+                (key, json.dumps(value), now, now),
+            )
+            if self.ttl is not None:
+                self.conn.execute("DELETE FROM cache WHERE created < ?", (now - self.ttl,))
+            # Drop the least recently used entries beyond the size limit
+            self.conn.execute(
+                "DELETE FROM cache WHERE key IN (SELECT key FROM cache ORDER BY accessed DESC LIMIT -1 OFFSET ?)",
+                (self.max_entries,),
+            )
+
+    def clear(self):
+        with self.lock, self.conn:
+            self.conn.execute("DELETE FROM cache")
+
+    def __len__(self):
+        with self.lock:
+            return self.conn.execute("SELECT COUNT(*) FROM cache").fetchone()[0]
+
+def make_backend(path=None, max_entries=MAX_ENTRIES, ttl=TTL_SECONDS):
+    if path:
+        return SQLiteBackend(path, max_entries=max_entries, ttl=ttl)
+    return MemoryBackend(max_entries=max_entries, ttl=ttl)
+
+class ExactCache:
+    """Caches LLM responses by model + prompt hash."""
+
+    def __init__(self, backend=None):
+        self.backend = backend or MemoryBackend()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def key(model, prompt):
+        return hashlib.sha256(f"{model}\0{prompt}".encode("utf-8")).hexdigest()
+
+    def get(self, model, prompt):
+        value = self.backend.get(self.key(model, prompt))
+        if value is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return value
+
+    def set(self, model, prompt, response):
+        self.backend.set(self.key(model, prompt), response)
+
+    def stats(self):
+        return {"hits": self.hits, "misses": self.misses, "entries": len(self.backend)}
+
+class SemanticCache:
+    """
+    Caches answers by question embedding for a given set of retrieved chunks.
+
+    A lookup hits when an earlier question retrieved exactly the same chunks and its
+    embedding has cosine similarity >= `threshold` with the new question's embedding.
+    """
+
+    def __init__(self, backend=None, threshold=0.95, max_per_group=16):
+        self.backend = backend or MemoryBackend()
+        self.threshold = threshold
+        self.max_per_group = max_per_group
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def group_key(model, chunk_ids):
+        joined = "\0".join(sorted(str(chunk_id) for chunk_id in chunk_ids))
+        return hashlib.sha256(f"{model}\0{joined}".encode("utf-8")).hexdigest()
+
+    @staticmethod
+    def _unit(embedding):
+        vector = np.asarray(embedding, dtype="float32").ravel()
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def get(self, model, embedding, chunk_ids):
+        entries = self.backend.get(self.group_key(model, chunk_ids)) or []
+        query = self._unit(embedding)
+        best_score, best_answer = -1.0, None
+        for cached_embedding, answer in entries:
+            score = float(np.dot(query, np.asarray(cached_embedding, dtype="float32")))
+            if score > best_score:
+                best_score, best_answer = score, answer
+        if best_answer is not None and best_score >= self.threshold:
+            self.hits += 1
+            return best_answer
+        self.misses += 1
+        return None
+
+    def set(self, model, embedding, chunk_ids, answer):
+        key = self.group_key(model, chunk_ids)
+        entries = self.backend.get(key) or []
+        entries.append([self._unit(embedding).tolist(), answer])
+        self.backend.set(key, entries[-self.max_per_group:])
+
+    def stats(self):
+        return {"hits": self.hits, "misses": self.misses, "entries": len(self.backend)}
+
+def chunk_id(text):
+    """Content-derived chunk ID, stable across sessions and index rebuilds."""
+    return hashlib.sha1(text.encode("utf-8")).hexdigest()
+
+# Shared caches used by core.llm and RAGChain
+response_cache = ExactCache(make_backend(CACHE_PATH))
+semantic_cache = SemanticCache(make_backend(CACHE_PATH + ".semantic" if CACHE_PATH else None))
+
+def cache_stats():
+    return {"exact": response_cache.stats(), "semantic": semantic_cache.stats()}
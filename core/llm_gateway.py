@@ -0,0 +1,114 @@
+import heapq
+import itertools
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+from core.models import get_client, KEEP_ALIVE, NUM_CTX
+from core.telemetry import metrics, span
+
+# Every LLM request goes through one gateway: requests wait in a priority queue for one of
+# a fixed number of slots, so Ollama is never sent more than it runs in parallel and
+# interactive answers are served ahead of the background agents.
+
+# Requests sent to Ollama at once; keep in step with the server's OLLAMA_NUM_PARALLEL
+MAX_PARALLEL = int(os.environ.get("ASKYOURDOCSX_LLM_PARALLEL", os.environ.get("OLLAMA_NUM_PARALLEL", "2")))
+# Requests allowed to wait for a slot before new ones are rejected
+MAX_QUEUED = int(os.environ.get("ASKYOURDOCSX_LLM_MAX_QUEUED", "64"))
+# Seconds a request may wait for a slot before it is rejected
+QUEUE_TIMEOUT = float(os.environ.get("ASKYOURDOCSX_LLM_QUEUE_TIMEOUT", "120"))
+
+# Lower numbers are served first
+INTERACTIVE = 0
+BACKGROUND = 10
+
+# Queue priority and reply length limit (num_predict tokens) for each caller
+AGENT_PROFILES = {
+    "answer": {"priority": INTERACTIVE, "num_predict": 1024},
+    "contradictions": {"priority": BACKGROUND, "num_predict": 384},
+    "actions": {"priority": BACKGROUND, "num_predict": 512},
+    "persona": {"priority": BACKGROUND, "num_predict": 768},
+}
+
+class LLMBusyError(RuntimeError):
+    """Raised when the gateway's queue is full or a request waited too long for a slot."""
+
+class LLMGateway:
+    def __init__(self, max_parallel=MAX_PARALLEL, max_queued=MAX_QUEUED, queue_timeout=QUEUE_TIMEOUT):
+        self.max_parallel = max_parallel
+        self.max_queued = max_queued
+        self.queue_timeout = queue_timeout
+        self.condition = threading.Condition()
+        self.queue = []  # Heap of (priority, arrival) tickets
+        self.arrivals = itertools.count()
+        self.running = 0
+
+    @contextmanager
+    def slot(self, priority=INTERACTIVE):
+        """Hold one of the gateway's slots for the duration of the block."""
+        ticket = (priority, next(self.arrivals))
+        with span("llm.queue", priority=priority) as current:
+            with self.condition:
+                if len(self.queue) >= self.max_queued:
+                    metrics.inc("askyourdocsx_llm_rejected_total", reason="queue_full")
+                    raise LLMBusyError(f"{len(self.queue)} LLM requests are already queued")
+                heapq.heappush(self.queue, ticket)
+                deadline = time.monotonic() + self.queue_timeout
+                try:
+                    # Served in priority order, first come first served within a priority
+                    while self.running >= self.max_parallel or self.queue[0] != ticket:
+                        remaining = deadline - time.monotonic()
+                        if remaining <= 0:
+                            metrics.inc("askyourdocsx_llm_rejected_total", reason="timeout")
+                            raise LLMBusyError(f"No LLM slot became free within {self.queue_timeout:g}s")
+                        self.condition.wait(remaining)
+                except BaseException:
+                    self.queue.remove(ticket)
+                    heapq.heapify(self.queue)
+                    self.condition.notify_all()
+                    raise
+                heapq.heappop(self.queue)
+                self.running += 1
+                self.condition.notify_all()  # The next ticket may fit in another free slot
+                current.set(queued=len(self.queue))
+        try:
+            yield
+        finally:
+            with self.condition:
+                self.running -= 1
+                self.condition.notify_all()
+
+    def stats(self):
+        with self.condition:
+            return {"running": self.running, "queued": len(self.queue), "max_parallel": self.max_parallel}
+
+    def _request(self, model, messages, agent, stream):
+        options = {"num_ctx": NUM_CTX, "num_predict": AGENT_PROFILES[agent]["num_predict"]}
+        return get_client().chat(model=model, messages=messages, stream=stream, options=options, keep_alive=KEEP_ALIVE)
+
+    def _stream(self, model, messages, agent):
+        # Ollama works on a streamed reply until it is fully read, so the slot is held until then
+        with self.slot(AGENT_PROFILES[agent]["priority"]):
+            yield from self._request(model, messages, agent, stream=True)
+
+    def chat(self, model, messages, agent="answer", stream=False):
+        """
+        Send a chat request to Ollama once a slot is free.
+
+        Args:
+            model (str): Ollama model name.
+            messages (list): Chat messages, as for ollama.Client.chat.
+            agent (str): Key of AGENT_PROFILES, which sets the priority and reply limit.
+            stream (bool): Return an iterator of response chunks instead of the response.
+
+        Raises:
+            LLMBusyError: The queue is full, or no slot became free within queue_timeout.
+                For a stream this is raised when iteration starts.
+        """
+        if stream:
+            return self._stream(model, messages, agent)
+        with self.slot(AGENT_PROFILES[agent]["priority"]):
+            return self._request(model, messages, agent, stream=False)
+
+gateway = LLMGateway()
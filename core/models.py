@@ -0,0 +1,118 @@
+import os
+import threading
+
+from core.tokens import PROMPT_TOKEN_BUDGET
+
+# Central registry for the embedding model and the Ollama client. Both are created on
+# first use, so importing the package (or running a parse-only job) stays cheap.
+
+EMBEDDING_MODEL = "all-MiniLM-L6-v2"
+LLM_MODEL = "gemma:2b"
+
+# How long Ollama keeps the LLM loaded after a request (a duration like "30m", or -1 for
+# forever); sent with every request so the model is not unloaded between questions
+KEEP_ALIVE = os.environ.get("ASKYOURDOCSX_KEEP_ALIVE", "30m")
+# Context window requested from Ollama: the prompt budget plus room for the longest reply.
+# Every request uses the same value, since a different num_ctx makes Ollama reload the model.
+NUM_CTX = int(os.environ.get("ASKYOURDOCSX_NUM_CTX", str(PROMPT_TOKEN_BUDGET + 1024)))
+# Seconds an HTTP request to Ollama may take before the client gives up
+LLM_TIMEOUT = float(os.environ.get("ASKYOURDOCSX_LLM_TIMEOUT", "300"))
+
+# Embedding runtime: "torch" (fp32 PyTorch), "torch-int8" (dynamically quantized Linear
+# layers), "onnx" (ONNX Runtime fp32) or "onnx-int8" (pre-quantized ONNX export)
+EMBEDDING_BACKENDS = ("torch", "torch-int8", "onnx", "onnx-int8")
+EMBEDDING_BACKEND = os.environ.get("ASKYOURDOCSX_EMBED_BACKEND", "torch")
+# Quantized ONNX file to load for "onnx-int8"; pick the variant matching the host CPU
+ONNX_INT8_FILE = os.environ.get("ASKYOURDOCSX_ONNX_INT8_FILE", "onnx/model_quint8_avx2.onnx")
+
+# Cross-encoder used to rerank retrieved chunks (only loaded when reranking is enabled)
+RERANKER_MODEL = os.environ.get("ASKYOURDOCSX_RERANKER_MODEL", "cross-encoder/ms-marco-MiniLM-L-6-v2")
+
+# Output sizes of common sentence-transformers models, so callers can size a
+# FAISS index without loading the model or running inference
+KNOWN_DIMENSIONS = {
+    "all-MiniLM-L6-v2": 384,
+    "all-MiniLM-L12-v2": 384,
+    "paraphrase-MiniLM-L6-v2": 384,
+    "all-mpnet-base-v2": 768,
+}
+
+_lock = threading.Lock()
+_embedder = None
+_reranker = None
+_client = None
+
+def load_embedder(backend=EMBEDDING_BACKEND, model_name=EMBEDDING_MODEL):
+    """Build a new SentenceTransformer for the given backend (uncached; see get_embedder)."""
+    from sentence_transformers import SentenceTransformer
+
+    if backend == "torch":
+        return SentenceTransformer(model_name)
+    if backend == "torch-int8":
+        import torch
+        model = SentenceTransformer(model_name, device="cpu")
+        return torch.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+    if backend == "onnx":
+        return SentenceTransformer(model_name, backend="onnx")
+    if backend == "onnx-int8":
+        return SentenceTransformer(model_name, backend="onnx", model_kwargs={"file_name": ONNX_INT8_FILE})
+    raise ValueError(f"Unknown embedding backend '{backend}'. Expected one of {EMBEDDING_BACKENDS}")
+
+def embedder_id(backend=EMBEDDING_BACKEND, model_name=EMBEDDING_MODEL):
+    # Different backends produce slightly different vectors, so caches key on both
+    return model_name if backend == "torch" else f"{model_name}:{backend}"
+
+def get_embedder():
+    global _embedder
+    if _embedder is None:
+        with _lock:
+            if _embedder is None:
+                _embedder = load_embedder()
+    return _embedder
+
+def get_reranker():
+    global _reranker
+    if _reranker is None:
+        with _lock:
+            if _reranker is None:
+                from sentence_transformers import CrossEncoder
+                _reranker = CrossEncoder(RERANKER_MODEL, device="cpu")
+    return _reranker
+
+def get_client():
+    global _client
+    if _client is None:
+        with _lock:
+            if _client is None:
+                from ollama import Client
+                _client = Client(timeout=LLM_TIMEOUT)
+    return _client
+
+def set_embedder(embedder):
+    # Replace the shared embedder, e.g. with an offline stand-in for benchmarks
+    global _embedder
+    with _lock:
+        _embedder = embedder
+
+def set_client(client):
+    # Replace the shared Ollama client, e.g. with a stub that needs no server
+    global _client
+    with _lock:
+        _client = client
+
+def embedding_dimension(model_name=EMBEDDING_MODEL):
+    if model_name in KNOWN_DIMENSIONS:
+        return KNOWN_DIMENSIONS[model_name]
+    return get_embedder().get_sentence_embedding_dimension()
+
+def warmup(embedder=True, llm=False):
+    """
+    Load models ahead of the first request.
+
+    Encodes one string so the embedder's weights are resident, and optionally asks
+    Ollama to load the LLM (an empty generate request loads the model without output).
+    """
+    if embedder:
+        get_embedder().encode(["warmup"], show_progress_bar=False)
+    if llm:
+        get_client().generate(model=LLM_MODEL, prompt="", keep_alive=KEEP_ALIVE, options={"num_ctx": NUM_CTX})
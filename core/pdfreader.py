@@ -1,17 +1,61 @@
+import io
 import os
 import re
 import PyPDF2  # Updated from fitz to PyPDF2
 from docx import Document
 
+from core.telemetry import traced
+
+PAGES_PER_TASK = 64  # Pages extracted per worker task when a PDF is split across processes
+
+IMAGE_EXTENSIONS = (".png", ".jpg", ".jpeg")
+
+def _ocr_page_images(page):
+    """OCR the images embedded in a scanned page whose text layer is empty."""
+    from core.imagereader import ocr_images  # OpenCV/tesseract are only needed for scans
+
+    try:
+        images = [image.data for image in page.images]
+    except Exception:
+        return ""  # Unsupported image encodings in the PDF
+    texts = ocr_images(images, skip_undecodable=True)
+    return "\n".join(text for text in texts if text)
+
+def iter_pdf_pages(source, start=0, stop=None, ocr_fallback=True):
+    """
+    Lazily yield (page_no, text) for each page of a PDF; page numbers are 1-based.
+
+    `source` may be a path, raw bytes or a binary file-like object. Pages with no
+    text layer (scans) are OCR'd from their embedded images when `ocr_fallback`.
+    """
+    if isinstance(source, str):
+        with open(source, "rb") as f:
+            yield from iter_pdf_pages(f, start, stop, ocr_fallback)
+        return
+    if isinstance(source, (bytes, bytearray)):
+        source = io.BytesIO(source)
+
+    reader = PyPDF2.PdfReader(source)
+    stop = len(reader.pages) if stop is None else min(stop, len(reader.pages))
+    for i in range(start, stop):
+        page = reader.pages[i]
+        text = page.extract_text() or ""  # fallback if None
+        if ocr_fallback and not text.strip():
+            text = _ocr_page_images(page)
+        yield i + 1, text
+
+def count_pdf_pages(data):
+    return len(PyPDF2.PdfReader(io.BytesIO(data)).pages)
+
+def extract_pdf_range(source, start, stop):
+    """Extract pages [start, stop) from a PDF path or bytes; a picklable unit of work for worker processes."""
+    return list(iter_pdf_pages(source, start, stop))
+
 def extract_pdf(path):
-    text = ""
-    with open(path, "rb") as f:
-        reader = PyPDF2.PdfReader(f)
-        for page in reader.pages:
-            text += page.extract_text() or ""  # fallback if None
-    return text.strip()
+    return "".join(text for _, text in iter_pdf_pages(path)).strip()
 
 def extract_doc(path):
+    # `path` may also be a binary file-like object
     doc = Document(path)
     return "\n".join([para.text for para in doc.paragraphs]).strip()
 
@@ -20,6 +64,27 @@ def save_text(text, filename):
     with open(f"data/processed_text/{filename}.txt", "w", encoding="utf-8") as f:
         f.write(text)
 
+@traced("parse")
+def parse_pages(data, filename):
+    """
+    Parse an in-memory upload without writing it to disk.
+
+    Returns:
+        list: (page_no, text) records; non-paginated formats are a single page 1.
+    """
+    name = filename.lower()
+    if name.endswith(".pdf"):
+        return list(iter_pdf_pages(data))
+    if name.endswith(".txt"):
+        return [(1, data.decode("utf-8"))]
+    if name.endswith(".docx"):
+        return [(1, extract_doc(io.BytesIO(data)))]
+    if name.endswith(IMAGE_EXTENSIONS):
+        from core.imagereader import ocr_from_bytes
+        return [(1, ocr_from_bytes(data))]
+    raise ValueError("Unsupported file type.")
+
+@traced("parse")
 def parse_file(filepath):
     if filepath.endswith(".pdf"):
         text = extract_pdf(filepath)
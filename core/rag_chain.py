@@ -1,52 +1,339 @@
-from core.chunker import chunk_text
+import contextvars
+import os
+from contextlib import nullcontext
+
+from core.chunker import chunk_pages
 from core.embeder import embed_chunks
 from core.vectorstore import FaissVectorStore  # Import from the new file
-from core.llm import generate_answer
+from core.index_cache import load_index, save_index
+from core.llm import generate_answer, MODEL
+from core.llm_cache import semantic_cache, chunk_id
+from core.hybrid import BM25Index, reciprocal_rank_fusion, rerank
+from core.telemetry import span, metrics
+from core.context_analysis import analyze_document, merge
+from core.dedup import Deduplicator
 import numpy as np
+from concurrent.futures import ThreadPoolExecutor
+
+NOT_AVAILABLE = "The answer is not available in the provided document section."
+
+# Set ASKYOURDOCSX_RERANK=1 to rerank fused candidates with the cross-encoder by default
+RERANK = os.environ.get("ASKYOURDOCSX_RERANK", "0") == "1"
+# Set ASKYOURDOCSX_SEMANTIC_CACHE=1 to reuse answers to near-identical questions. Off by
+# default: questions that differ only in a year, number or negation can pass its threshold
+SEMANTIC_CACHE = os.environ.get("ASKYOURDOCSX_SEMANTIC_CACHE", "0") == "1"
+# Set ASKYOURDOCSX_DEDUP=0 to store every chunk, even exact copies of stored ones
+DEDUP = os.environ.get("ASKYOURDOCSX_DEDUP", "1") == "1"
+# Set ASKYOURDOCSX_DEDUP_NEAR=1 to also merge near copies; they are stored as the first version's text
+DEDUP_NEAR = os.environ.get("ASKYOURDOCSX_DEDUP_NEAR", "0") == "1"
 
 class RAGChain:
+    DEFAULT_DOC_ID = "__default__"
 
-    def __init__(self, dimension, top_k=5):
-        self.store = FaissVectorStore(dimension)
+    def __init__(self, dimension, top_k=5, max_parallel=4, use_semantic_cache=SEMANTIC_CACHE,
+                 use_lexical=True, use_reranker=RERANK, candidates=20, rerank_top_k=3, dedup=DEDUP, dedup_near=DEDUP_NEAR, **store_options):
+        # store_options select the FAISS backend, e.g. index_type="auto", metric="cosine"
+        self.store = FaissVectorStore(dimension, **store_options)
+        # BM25 over the same chunks catches exact terms (names, codes) that embeddings miss
+        self.lexical = BM25Index() if use_lexical else None
+        self.use_reranker = use_reranker
+        self.candidates = candidates      # Results taken from each retriever before fusion
+        self.rerank_top_k = rerank_top_k  # Chunks sent to the LLM after reranking
         self.top_k = top_k
+        # Chunks that repeat a stored chunk are not stored again, only referenced from it
+        self.dedup = Deduplicator(near=dedup_near) if dedup else None
+        self.dedup_counts = {"chunks": 0, "exact": 0, "near": 0}
+        self.contexts = {}  # document ID -> context analysis, computed once when it is indexed
+        self._merged_context = None
+        self.max_parallel = max_parallel  # Concurrent LLM generations in a multi-question query
+        # Reuse answers to near-identical questions that retrieved the same chunks
+        self.semantic_cache = semantic_cache if use_semantic_cache else None
+        # Held around every read of the index; a server sharing the chain between threads
+        # sets it to the reader side of its lock, so retrieval waits out index updates
+        self.read_lock = nullcontext
+
+    @property
+    def texts(self):
+        return self.store.texts  # Required for 'whose resume' question
+
+    def documents(self):
+        return self.store.documents()
+
+    def add_document(self, doc_id, document_text=None, cache_key=None, pages=None):
+        """
+        Chunk, embed and index one document under `doc_id`.
+
+        Pass `pages` as (page_no, text) records instead of `document_text` to keep page
+        provenance: each chunk then records the page and offset it starts at, and
+        search results can cite them.
+
+        When `cache_key` is given, the document's chunks and vectors are loaded from the
+        on-disk index cache if present (and written there otherwise), so a known
+        document costs no embedding work.
+
+        With deduplication on, chunks that repeat a stored chunk (or an earlier chunk of
+        the same document) are neither embedded nor stored; the stored chunk lists them
+        under "sources" instead. Only exact copies are merged unless `dedup_near` is set.
+        """
+        if doc_id in self.store.documents():
+            raise ValueError(f"Document '{doc_id}' is already indexed; use replace_document instead.")
+
+        cached = load_index(cache_key, mmap=True) if cache_key is not None else None
+        embeddings = None
+        if cached is not None:
+            embeddings, chunks, metadata = cached.document_vectors(cache_key)
+        else:
+            with span("chunk", document=doc_id):
+                records = list(chunk_pages(pages if pages is not None else [(None, document_text)]))
+            chunks = [record["text"] for record in records]
+            # Page, offset, token count and section travel with each chunk into the store
+            metadata = [
+                {key: value for key, value in record.items() if key != "text" and value is not None}
+                for record in records
+            ]
+            if not chunks:
+                return 0
+
+        matches = self._find_duplicates(chunks)
+        keep = [i for i, match in enumerate(matches) if match is None]
+        try:
+            if embeddings is None:
+                if cache_key is not None:
+                    # The cache holds the whole document, so it stays valid for any index
+                    embeddings = embed_chunks(chunks)
+                    doc_store = FaissVectorStore(self.store.dimension)
+                    doc_store.add(embeddings, chunks, doc_id=cache_key, metadata=metadata)
+                    save_index(cache_key, doc_store)
+                elif keep:
+                    embeddings = embed_chunks([chunks[i] for i in keep])
+            # Whole-document vectors (cached, or embedded for the cache) are narrowed to the new chunks
+            if keep and len(embeddings) != len(keep):
+                embeddings = embeddings[keep]
+            ids = self.store.add(embeddings, [chunks[i] for i in keep], doc_id=doc_id,
+                                 metadata=[metadata[i] for i in keep]) if keep else []
+        except BaseException:
+            if self.dedup is not None:
+                for i in keep:
+                    self.dedup.remove(("new", i))
+            raise
+        self._record_duplicates(doc_id, matches, dict(zip(keep, ids)), metadata)
+        if self.lexical is not None:
+            self.lexical.add(ids, [chunks[i] for i in keep])
+        if pages is not None or document_text is not None:
+            with span("context_analysis", document=doc_id):
+                self.contexts[doc_id] = analyze_document(pages if pages is not None else [document_text], key=cache_key)
+            self._merged_context = None
+        return len(chunks)
+
+    def _find_duplicates(self, chunks):
+        """
+        Match each chunk against the stored chunks and the document's earlier chunks.
+
+        Returns one entry per chunk: None for a new chunk, else (key, "exact" or "near")
+        of the chunk it repeats. New chunks are registered under ("new", position)
+        until they are stored.
+        """
+        if self.dedup is None:
+            return [None] * len(chunks)
+        matches = []
+        with span("dedup", chunks=len(chunks)) as current:
+            for i, text in enumerate(chunks):
+                fingerprint = self.dedup.fingerprint(text)
+                match = self.dedup.find(fingerprint)
+                if match is None:
+                    self.dedup.add(("new", i), fingerprint)
+                matches.append(match)
+            current.set(duplicates=sum(match is not None for match in matches))
+        return matches
+
+    def _record_duplicates(self, doc_id, matches, new_ids, metadata):
+        # new_ids maps a new chunk's position to the ID it was stored under
+        if self.dedup is not None:
+            for i, chunk_id in new_ids.items():
+                self.dedup.rename(("new", i), chunk_id)
+        self.dedup_counts["chunks"] += len(matches)
+        for i, match in enumerate(matches):
+            if match is None:
+                continue
+            key, kind = match
+            chunk_id = new_ids[key[1]] if isinstance(key, tuple) else key
+            self.store.add_reference(chunk_id, doc_id, metadata[i])
+            self.dedup_counts[kind] += 1
+            metrics.inc("askyourdocsx_duplicate_chunks_total", kind=kind)
+
+    def dedup_stats(self):
+        """Chunks indexed so far, how many repeated a stored chunk, and the resulting ratio."""
+        stats = dict(self.dedup_counts)
+        stats["duplicates"] = stats["exact"] + stats["near"]
+        stats["dedup_ratio"] = stats["duplicates"] / stats["chunks"] if stats["chunks"] else 0.0
+        return stats
+
+    def remove_document(self, doc_id):
+        # Only chunks no other document references leave the index
+        ids = self.store.exclusive_chunks(doc_id)
+        if self.lexical is not None:
+            self.lexical.remove(ids, [self.store.chunks[chunk_id] for chunk_id in ids])
+        if self.dedup is not None:
+            for chunk_id in ids:
+                self.dedup.remove(chunk_id)
+        if self.contexts.pop(doc_id, None) is not None:
+            self._merged_context = None
+        return self.store.remove_document(doc_id)
+
+    def document_context(self):
+        """Context analysis of all indexed documents, merged once per change to the document set."""
+        with self.read_lock():
+            if self._merged_context is None:
+                self._merged_context = merge(self.contexts.values())
+            return self._merged_context
 
-    def build_index(self, document_text):
-        chunks = chunk_text(document_text)
-        embeddings = embed_chunks(chunks)
-        self.store.add(embeddings, chunks)
-        self.texts = chunks  # Required for 'whose resume' question
+    def replace_document(self, doc_id, document_text=None, cache_key=None, pages=None):
+        self.remove_document(doc_id)
+        return self.add_document(doc_id, document_text, cache_key=cache_key, pages=pages)
 
-    def query(self, questions):
+    def build_index(self, document_text, cache_key=None):
+        # Index the text as a single document; calling this again replaces it
+        self.replace_document(self.DEFAULT_DOC_ID, document_text, cache_key=cache_key)
+
+    def _resume_owner(self):
+        with self.read_lock():
+            # The inverted index narrows the scan to chunks containing all three terms
+            candidates = self.lexical.matching("SUMMARY Aspiring LLM") if self.lexical is not None else self.store.chunks
+            for idx in sorted(candidates):
+                chunk = self.store.chunks[idx]
+                if "SUMMARY" in chunk and "Aspiring LLM" in chunk:
+                    # Chunks are small, so the name is on the first line of the document's first chunk
+                    first_chunk = self.store.chunks[self.store.first_chunk(self.store.chunk_docs[idx])]
+                    name_line = first_chunk.split('\n')[0].strip()
+                    return f"This is the resume of {name_line}"
+            return NOT_AVAILABLE
+
+    def _cached_answer(self, question_embedding, context_chunks):
+        if self.semantic_cache is None:
+            return None
+        return self.semantic_cache.get(MODEL, question_embedding, [chunk_id(text) for text in context_chunks])
+
+    def _cache_answer(self, question_embedding, context_chunks, answer):
+        if self.semantic_cache is not None:
+            self.semantic_cache.set(MODEL, question_embedding, [chunk_id(text) for text in context_chunks], answer)
+
+    def _search_batch(self, questions, question_embeddings, top_k=None, filters=None):
+        """
+        Retrieve context for each question.
+
+        `filters` restricts both retrievers to matching chunks; its keys are the
+        FaissVectorStore.search_batch filters (doc_ids, types, pages).
+
+        Dense results are fused with BM25 results by reciprocal rank. With the reranker
+        enabled, the fused candidates are rescored by the cross-encoder and only the
+        best `rerank_top_k` are kept, so the LLM gets fewer, more relevant chunks.
+        An explicit `top_k` overrides both limits.
+        """
+        filters = filters or {}
+        limit = top_k or (self.rerank_top_k if self.use_reranker else self.top_k)
+        with self.read_lock():
+            if self.lexical is None and not self.use_reranker:
+                return self.store.search_batch(question_embeddings, top_k=limit, **filters)
+
+            pool = max(self.candidates, limit)
+            allowed = set(self.store.table.select(**filters).tolist()) if filters else None
+            batch_results = []
+            for question, dense_results in zip(questions, self.store.search_batch(question_embeddings, top_k=pool, **filters)):
+                by_id = {result["id"]: result for result in dense_results}
+                rankings = [list(by_id)]
+                if self.lexical is not None:
+                    with span("bm25_search"):
+                        rankings.append([idx for idx, _ in self.lexical.search(question, pool, allowed)])
+                fused = reciprocal_rank_fusion(rankings, top_k=pool if self.use_reranker else limit)
+                results = []
+                for idx, score in fused:
+                    result = by_id.get(idx) or self.store.result(idx, doc_ids=filters.get("doc_ids"))
+                    result["fused_score"] = score
+                    results.append(result)
+                batch_results.append(results)
+
+        if self.use_reranker:
+            batch_results = rerank(questions, batch_results, limit)
+        return batch_results
+
+    def query(self, questions, filters=None):
         if isinstance(questions, str):
             questions = [questions]
 
-        answers = []
-        for question in questions:
+        answers = [None] * len(questions)
+        pending = []
+        for i, question in enumerate(questions):
             # First try to find exact matches for simple questions
             if question.lower().startswith("whose resume is this"):
-                for chunk in self.texts:
-                    if "SUMMARY" in chunk and "Aspiring LLM" in chunk:
-                        name_line = chunk.split('\n')[0].strip()
-                        answers.append(f"This is the resume of {name_line}")
-                        break
+                answers[i] = self._resume_owner()
+            else:
+                pending.append(i)
+
+        if pending:
+            # Normal RAG process for other questions: one encode call and one FAISS search for all of them
+            question_embeddings = embed_chunks([questions[i] for i in pending], show_progress_bar=False)
+            if question_embeddings.ndim == 1:
+                question_embeddings = np.expand_dims(question_embeddings, axis=0)
+            batch_results = self._search_batch([questions[i] for i in pending], question_embeddings, filters=filters)
+
+            jobs = []
+            for i, embedding, results in zip(pending, question_embeddings, batch_results):
+                context_chunks = [res["text"] for res in results]
+                if not context_chunks:
+                    answers[i] = NOT_AVAILABLE
+                    continue
+                cached = self._cached_answer(embedding, context_chunks)
+                if cached is not None:
+                    answers[i] = cached
                 else:
-                    answers.append("The answer is not available in the provided document section.")
-                continue
+                    jobs.append((i, embedding, context_chunks))
+
+            # Generate answers concurrently, at most max_parallel requests in flight
+            if len(jobs) == 1:
+                i, _, context_chunks = jobs[0]
+                answers[i] = generate_answer(context_chunks, questions[i])
+            elif jobs:
+                with ThreadPoolExecutor(max_workers=min(self.max_parallel, len(jobs))) as pool:
+                    # The context is copied here, on the caller's thread, so each job's spans join the caller's trace
+                    futures = [
+                        pool.submit(contextvars.copy_context().run, generate_answer, context_chunks, questions[i])
+                        for i, _, context_chunks in jobs
+                    ]
+                    for (i, _, _), future in zip(jobs, futures):
+                        answers[i] = future.result()
+            for i, embedding, context_chunks in jobs:
+                self._cache_answer(embedding, context_chunks, answers[i])
 
-            # Normal RAG process for other questions
-            question_embedding = embed_chunks([question])
+        return answers if len(answers) > 1 else answers[0]
 
-            if question_embedding.ndim == 1:
-                question_embedding = np.expand_dims(question_embedding, axis=0)
+    def search(self, question, top_k=None, filters=None):
+        """Return the top-k search results (text, doc_id, metadata such as page) and the question embedding."""
+        question_embedding = embed_chunks([question], show_progress_bar=False)
+        return self._search_batch([question], question_embedding, top_k, filters)[0], question_embedding
 
-            results = self.store.search(question_embedding, top_k=self.top_k)
-            context_chunks = [res["text"] for res in results]
+    def retrieve(self, question, top_k=None, filters=None):
+        """Return the top-k chunk texts for a question, without calling the LLM."""
+        results, question_embedding = self.search(question, top_k, filters)
+        return [res["text"] for res in results], question_embedding
 
-            if not context_chunks:
-                answers.append("The answer is not available in the provided document section.")
-                continue
+    def query_stream(self, question, filters=None):
+        """Answer a single question, yielding the answer tokens as they are generated."""
+        if question.lower().startswith("whose resume is this"):
+            yield self._resume_owner()
+            return
 
-            answer = generate_answer(context_chunks, question)
-            answers.append(answer)
+        context_chunks, question_embedding = self.retrieve(question, filters=filters)
+        if not context_chunks:
+            yield NOT_AVAILABLE
+            return
 
-        return answers if len(answers) > 1 else answers[0]
+        cached = self._cached_answer(question_embedding, context_chunks)
+        if cached is not None:
+            yield cached
+            return
+
+        tokens = []
+        for token in generate_answer(context_chunks, question, stream=True):
+            tokens.append(token)
+            yield token
+        self._cache_answer(question_embedding, context_chunks, "".join(tokens))
@@ -0,0 +1,198 @@
+import contextvars
+import functools
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+# Spans time the pipeline stages (parse, chunk, embed, search, LLM calls, agents). Every
+# finished span feeds a latency histogram and is handed to the registered exporters;
+# inside a trace() block the spans are also collected for display, e.g. in the UI.
+
+# Upper bounds (seconds) of the latency histogram buckets
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+# Set ASKYOURDOCSX_TRACE_LOG to a file path to append every span there as a JSON line
+TRACE_LOG = os.environ.get("ASKYOURDOCSX_TRACE_LOG")
+
+_trace = contextvars.ContextVar("askyourdocsx_trace", default=None)
+_parent = contextvars.ContextVar("askyourdocsx_span", default=None)
+
+class Histogram:
+    def __init__(self, buckets=BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # Last slot is +Inf
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+                break
+        else:
+            self.counts[-1] += 1
+        self.sum += value
+        self.count += 1
+
+class MetricsRegistry:
+    """Thread-safe histograms and counters keyed by metric name and label set."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.histograms = {}  # (name, labels) -> Histogram
+        self.counters = {}    # (name, labels) -> float
+
+    @staticmethod
+    def _key(name, labels):
+        return name, tuple(sorted((key, str(value)) for key, value in labels.items()))
+
+    def observe(self, name, value, **labels):
+        with self.lock:
+            self.histograms.setdefault(self._key(name, labels), Histogram()).observe(value)
+
+    def inc(self, name, value=1, **labels):
+        key = self._key(name, labels)
+        with self.lock:
+            self.counters[key] = self.counters.get(key, 0) + value
+
+    def snapshot(self):
+        with self.lock:
+            return {
+                "histograms": [
+                    {"name": name, "labels": dict(labels), "buckets": list(zip(hist.buckets, hist.counts)),
+                     "inf": hist.counts[-1], "sum": hist.sum, "count": hist.count}
+                    for (name, labels), hist in self.histograms.items()
+                ],
+                "counters": [
+                    {"name": name, "labels": dict(labels), "value": value}
+                    for (name, labels), value in self.counters.items()
+                ],
+            }
+
+metrics = MetricsRegistry()
+
+def _labels(labels, extra=None):
+    pairs = list(labels.items()) + ([extra] if extra else [])
+    return "{" + ",".join(f'{key}="{value}"' for key, value in pairs) + "}" if pairs else ""
+
+def render_prometheus(registry=metrics):
+    """Render the registry in the Prometheus text exposition format."""
+    lines = []
+    snapshot = registry.snapshot()
+    for name in sorted({hist["name"] for hist in snapshot["histograms"]}):
+        lines.append(f"# TYPE {name} histogram")
+        for hist in (h for h in snapshot["histograms"] if h["name"] == name):
+            cumulative = 0
+            for bound, count in hist["buckets"]:
+                cumulative += count
+                lines.append(f"{name}_bucket{_labels(hist['labels'], ('le', bound))} {cumulative}")
+            lines.append(f"{name}_bucket{_labels(hist['labels'], ('le', '+Inf'))} {hist['count']}")
+            lines.append(f"{name}_sum{_labels(hist['labels'])} {hist['sum']}")
+            lines.append(f"{name}_count{_labels(hist['labels'])} {hist['count']}")
+    for name in sorted({counter["name"] for counter in snapshot["counters"]}):
+        lines.append(f"# TYPE {name} counter")
+        for counter in (c for c in snapshot["counters"] if c["name"] == name):
+            lines.append(f"{name}{_labels(counter['labels'])} {counter['value']}")
+    return "\n".join(lines) + "\n"
+
+class JsonLogExporter:
+    """Appends every finished span to a file as one JSON line."""
+
+    def __init__(self, path):
+        self.path = path
+        self.lock = threading.Lock()
+
+    def export(self, record):
+        line = json.dumps(record, ensure_ascii=False, default=str)
+        with self.lock, open(self.path, "a", encoding="utf-8") as f:
+            f.write(line + "\n")
+
+_exporters = [JsonLogExporter(TRACE_LOG)] if TRACE_LOG else []
+
+def add_exporter(exporter):
+    """Register an object with an export(span_record) method, called for every finished span."""
+    _exporters.append(exporter)
+
+class Span:
+    def __init__(self, name, attrs):
+        self.name = name
+        self.attrs = attrs
+
+    def set(self, **attrs):
+        self.attrs.update(attrs)
+
+@contextmanager
+def span(name, **attrs):
+    """
+    Time a block as a named span.
+
+    The duration is observed in the askyourdocsx_span_seconds histogram; attributes
+    set on the span (token counts, cache hits, ...) travel with the span record.
+    """
+    current = Span(name, attrs)
+    parent = _parent.get()
+    token = _parent.set(name)
+    started_at = time.time()
+    started = time.perf_counter()
+    error = None
+    try:
+        yield current
+    except BaseException as e:
+        error = type(e).__name__
+        raise
+    finally:
+        seconds = time.perf_counter() - started
+        _parent.reset(token)
+        metrics.observe("askyourdocsx_span_seconds", seconds, span=name)
+        record = {"name": name, "parent": parent, "start": started_at, "seconds": seconds, "attrs": current.attrs}
+        if error:
+            record["error"] = error
+        spans = _trace.get()
+        if spans is not None:
+            spans.append(record)
+        for exporter in _exporters:
+            exporter.export(record)
+
+def traced(name):
+    """Decorator form of span() for plain functions."""
+    def decorate(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with span(name):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorate
+
+@contextmanager
+def trace():
+    """Collect the spans finished inside the block (and in threads started with its context)."""
+    spans = []
+    token = _trace.set(spans)
+    try:
+        yield spans
+    finally:
+        _trace.reset(token)
+
+def record_llm_usage(current, response, model):
+    """Copy Ollama's token counts and durations (nanoseconds) from a final response onto a span."""
+    def field(key):
+        try:
+            return response[key]
+        except (KeyError, TypeError):
+            return None
+
+    prompt_tokens, completion_tokens = field("prompt_eval_count"), field("eval_count")
+    prompt_eval, evaluation = field("prompt_eval_duration"), field("eval_duration")
+    if prompt_tokens is not None:
+        metrics.inc("askyourdocsx_llm_prompt_tokens_total", prompt_tokens, model=model)
+        current.set(prompt_tokens=prompt_tokens)
+    if completion_tokens is not None:
+        metrics.inc("askyourdocsx_llm_completion_tokens_total", completion_tokens, model=model)
+        current.set(completion_tokens=completion_tokens)
+    if prompt_eval is not None:
+        metrics.observe("askyourdocsx_llm_prompt_eval_seconds", prompt_eval / 1e9, model=model)
+        current.set(prompt_eval_seconds=prompt_eval / 1e9)
+    if evaluation is not None:
+        metrics.observe("askyourdocsx_llm_eval_seconds", evaluation / 1e9, model=model)
+        current.set(eval_seconds=evaluation / 1e9)
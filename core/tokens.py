@@ -0,0 +1,61 @@
+import os
+
+_encoding = None
+_encoding_loaded = False
+
+# Maximum prompt size sent to the model; gemma:2b's context also has to fit the reply
+PROMPT_TOKEN_BUDGET = int(os.environ.get("ASKYOURDOCSX_PROMPT_TOKEN_BUDGET", "2048"))
+
+CHARS_PER_TOKEN = 4  # Rough fallback ratio when tiktoken is not available
+
+def _get_encoding():
+    # Loaded on first use: tiktoken reads (and may download) its BPE tables
+    global _encoding, _encoding_loaded
+    if not _encoding_loaded:
+        try:
+            import tiktoken
+            _encoding = tiktoken.get_encoding("cl100k_base")
+        except Exception:  # tiktoken missing or its encoding files unavailable offline
+            _encoding = None
+        _encoding_loaded = True
+    return _encoding
+
+def count_tokens(text):
+    encoding = _get_encoding()
+    if encoding is not None:
+        return len(encoding.encode(text, disallowed_special=()))
+    return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+def truncate_to_tokens(text, max_tokens):
+    """Keep the first `max_tokens` tokens of `text`."""
+    max_tokens = max(max_tokens, 0)
+    encoding = _get_encoding()
+    if encoding is not None:
+        tokens = encoding.encode(text, disallowed_special=())
+        if len(tokens) <= max_tokens:
+            return text
+        return encoding.decode(tokens[:max_tokens])
+    return text[:max_tokens * CHARS_PER_TOKEN]
+
+def fit_to_budget(text, fixed_prompt, budget=None):
+    """Truncate `text` so that it fits into the budget left over by `fixed_prompt`."""
+    budget = PROMPT_TOKEN_BUDGET if budget is None else budget
+    return truncate_to_tokens(text, budget - count_tokens(fixed_prompt))
+
+def enforce_budget(prompt, budget=None):
+    """
+    Last-resort guard for a complete prompt: drop tokens from the middle so that the
+    instructions at the start and the question at the end both survive.
+    """
+    budget = PROMPT_TOKEN_BUDGET if budget is None else budget
+    if count_tokens(prompt) <= budget:
+        return prompt
+    marker = "\n...\n"
+    half = max((budget - count_tokens(marker)) // 2, 0)
+    head = truncate_to_tokens(prompt, half)
+    encoding = _get_encoding()
+    if encoding is not None:
+        tail = encoding.decode(encoding.encode(prompt, disallowed_special=())[-half:]) if half else ""
+    else:
+        tail = prompt[-half * CHARS_PER_TOKEN:] if half else ""
+    return head + marker + tail
@@ -1,33 +1,522 @@
+import json
+import os
+
 import faiss
 import numpy as np
 
+from core.telemetry import span
+
+INDEX_FILE = "index.faiss"
+CHUNKS_FILE = "chunks.json"
+STORE_FORMAT = 4  # Bump whenever the sidecar layout changes
+
+INDEX_TYPES = ("flat", "ivf_flat", "ivf_pq", "hnsw", "auto")
+METRICS = ("l2", "ip", "cosine")
+
+# Filtered searches over at most this many chunks score just those vectors exactly
+# instead of searching the whole index with an ID selector
+SUBSET_SEARCH_LIMIT = 20000
+# HNSW graphs cannot drop vectors: removed chunks are excluded from searches and the graph
+# is rebuilt only once they make up this share of it
+TOMBSTONE_RATIO = 0.2
+
+def build_faiss_index(index_type, dimension, metric="l2", nlist=1024, pq_m=48, hnsw_m=32):
+    """
+    Create an empty FAISS index of the given type.
+
+    IVF indexes must be trained before vectors are added; flat and HNSW indexes need no training.
+    """
+    faiss_metric = faiss.METRIC_L2 if metric == "l2" else faiss.METRIC_INNER_PRODUCT
+    if index_type == "flat":
+        return faiss.IndexFlatL2(dimension) if metric == "l2" else faiss.IndexFlatIP(dimension)
+    if index_type == "hnsw":
+        return faiss.IndexHNSWFlat(dimension, hnsw_m, faiss_metric)
+
+    quantizer = faiss.IndexFlatL2(dimension) if metric == "l2" else faiss.IndexFlatIP(dimension)
+    if index_type == "ivf_flat":
+        index = faiss.IndexIVFFlat(quantizer, dimension, nlist, faiss_metric)
+    elif index_type == "ivf_pq":
+        if dimension % pq_m != 0:
+            raise ValueError(f"pq_m={pq_m} must divide the embedding dimension {dimension}")
+        index = faiss.IndexIVFPQ(quantizer, dimension, nlist, pq_m, 8, faiss_metric)
+    else:
+        raise ValueError(f"Unknown index type '{index_type}'. Expected one of {INDEX_TYPES}")
+    # A hashtable direct map keeps reconstruct() and remove_ids() working with arbitrary IDs
+    index.set_direct_map_type(faiss.DirectMap.Hashtable)
+    return index
+
+class ChunkTable:
+    """
+    Columnar chunk metadata used for filtering, indexed by chunk ID.
+
+    Document and type names are interned to small integer codes, so a filter over the
+    whole corpus is a few vectorized numpy comparisons rather than a loop over dicts.
+    """
+
+    def __init__(self, capacity=1024):
+        self.doc_code = np.full(capacity, -1, dtype='int32')
+        self.type_code = np.full(capacity, -1, dtype='int16')
+        self.page = np.full(capacity, -1, dtype='int32')  # -1 when the chunk has no page
+        self.alive = np.zeros(capacity, dtype=bool)
+        self.doc_codes = {}   # document ID -> code
+        self.type_codes = {}  # type name -> code
+        self.type_names = []  # code -> type name
+        self.shared = {}      # document code -> IDs of chunks it shares with their owning document
+
+    def _grow(self, size):
+        capacity = len(self.alive)
+        if size <= capacity:
+            return
+        capacity = max(size, 2 * capacity)
+        for name, fill in (("doc_code", -1), ("type_code", -1), ("page", -1), ("alive", False)):
+            column = getattr(self, name)
+            grown = np.full(capacity, fill, dtype=column.dtype)
+            grown[:len(column)] = column
+            setattr(self, name, grown)
+
+    def add(self, chunk_ids, doc_id, metadata):
+        if not chunk_ids:
+            return
+        self._grow(max(chunk_ids) + 1)
+        doc = self.doc_codes.setdefault(doc_id, len(self.doc_codes))
+        for chunk_id, meta in zip(chunk_ids, metadata):
+            meta = meta or {}
+            # The type defaults to the file extension of the document name
+            chunk_type = meta.get("type") or (os.path.splitext(doc_id)[1].lstrip(".").lower() if isinstance(doc_id, str) else "")
+            self.doc_code[chunk_id] = doc
+            if chunk_type not in self.type_codes:
+                self.type_codes[chunk_type] = len(self.type_names)
+                self.type_names.append(chunk_type)
+            self.type_code[chunk_id] = self.type_codes[chunk_type]
+            self.page[chunk_id] = meta.get("page") or -1
+            self.alive[chunk_id] = True
+
+    def remove(self, chunk_ids):
+        self.alive[np.array(chunk_ids, dtype='int64')] = False
+
+    def share(self, chunk_id, doc_id):
+        # The chunk also matches filters on doc_id, not just on its owning document
+        doc = self.doc_codes.setdefault(doc_id, len(self.doc_codes))
+        self.shared.setdefault(doc, set()).add(chunk_id)
+
+    def unshare(self, chunk_id, doc_id):
+        doc = self.doc_codes.get(doc_id)
+        if doc is not None:
+            self.shared.get(doc, set()).discard(chunk_id)
+
+    def type_of(self, chunk_id):
+        code = self.type_code[chunk_id]
+        return self.type_names[code] if code >= 0 else ""
+
+    def select(self, doc_ids=None, types=None, pages=None):
+        """IDs of live chunks matching every given filter; pages is an inclusive (first, last) range."""
+        mask = self.alive.copy()
+        if doc_ids is not None:
+            codes = [self.doc_codes[doc_id] for doc_id in doc_ids if doc_id in self.doc_codes]
+            in_docs = np.isin(self.doc_code, codes)
+            shared = [chunk_id for code in codes for chunk_id in self.shared.get(code, ())]
+            if shared:
+                in_docs[np.array(shared, dtype='int64')] = True
+            mask &= in_docs
+        if types is not None:
+            codes = [self.type_codes[name.lower()] for name in types if name.lower() in self.type_codes]
+            mask &= np.isin(self.type_code, codes)
+        if pages is not None:
+            first, last = pages
+            mask &= (self.page >= first) & (self.page <= last)
+        return np.flatnonzero(mask).astype('int64')
+
 class FaissVectorStore:
-    def __init__(self, dimension):
+    def __init__(self, dimension, index_type="flat", metric="l2", nlist=None, pq_m=48, hnsw_m=32,
+                 nprobe=16, ef_search=64, promote_at=50000, promote_to="hnsw"):
+        """
+        Args:
+            dimension (int): Embedding dimension.
+            index_type (str): "flat" (exact), "ivf_flat", "ivf_pq", "hnsw", or "auto".
+                Approximate indexes start as a flat index and are built once enough chunks
+                exist to train them; "auto" stays flat until `promote_at` chunks and then
+                switches to `promote_to`.
+            metric (str): "l2", "ip" (inner product) or "cosine" (inner product on
+                L2-normalized vectors). For "ip" and "cosine", higher distances are better.
+            nlist (int, optional): IVF cell count; defaults to ~4*sqrt(N) at build time.
+            pq_m (int): IVF-PQ sub-quantizer count; must divide `dimension`.
+            hnsw_m (int): HNSW graph degree.
+            nprobe (int): IVF cells visited per query (recall/speed knob).
+            ef_search (int): HNSW candidate list size per query (recall/speed knob).
+            promote_at (int): Chunk count at which an "auto" store leaves flat search.
+            promote_to (str): Index type an "auto" store is promoted to.
+        """
+        if index_type not in INDEX_TYPES:
+            raise ValueError(f"Unknown index type '{index_type}'. Expected one of {INDEX_TYPES}")
+        if metric not in METRICS:
+            raise ValueError(f"Unknown metric '{metric}'. Expected one of {METRICS}")
         self.dimension = dimension
-        self.index = faiss.IndexFlatL2(dimension)  # L2 distance for similarity search
-        self.texts = []
+        self.index_type = index_type
+        self.metric = metric
+        self.nlist = nlist
+        self.pq_m = pq_m
+        self.hnsw_m = hnsw_m
+        self.nprobe = nprobe
+        self.ef_search = ef_search
+        self.promote_at = promote_at
+        self.promote_to = promote_to
+        self.built_type = "flat"  # Index type currently backing the store
+        # The ID map gives every chunk a stable ID so a single document's chunks
+        # can be removed without rebuilding the index
+        self.index = faiss.IndexIDMap2(build_faiss_index("flat", dimension, self._base_metric()))
+        self.chunks = {}      # chunk ID -> text
+        self.chunk_docs = {}  # chunk ID -> document ID
+        self.chunk_meta = {}  # chunk ID -> provenance, e.g. {"page": 3, "offset": 120}
+        self.doc_chunks = {}  # document ID -> [chunk IDs]
+        self.doc_refs = {}    # document ID -> [chunk IDs] stored for other documents that it also contains
+        self.table = ChunkTable()  # Filter columns: document, type, page
+        self.next_id = 0
+        self.deleted = set()  # IDs of removed chunks still in the HNSW graph
+        self._live_selector = None
+
+    def _base_metric(self):
+        return "l2" if self.metric == "l2" else "ip"
+
+    def _prepare(self, vectors):
+        vectors = np.ascontiguousarray(np.array(vectors), dtype='float32')
+        if vectors.ndim == 1:
+            vectors = np.expand_dims(vectors, axis=0)
+        if self.metric == "cosine":
+            faiss.normalize_L2(vectors)
+        return vectors
+
+    def _target_type(self, count):
+        """Index type the store should use once it holds `count` chunks."""
+        if self.index_type == "auto":
+            return self.promote_to if count >= self.promote_at else "flat"
+        if self.index_type.startswith("ivf"):
+            # Training wants roughly 39 points per IVF cell; stay exact until then
+            min_points = 39 * self._nlist_for(count)
+            if self.index_type == "ivf_pq":
+                min_points = max(min_points, 39 * 256)  # 8-bit PQ codebooks have 256 centroids each
+            return self.index_type if count >= min_points else "flat"
+        return self.index_type
+
+    def _nlist_for(self, count):
+        return self.nlist or max(1, int(4 * np.sqrt(max(count, 1))))
+
+    def _rebuild(self, index_type, ids):
+        """Rebuild the index as `index_type` from the stored vectors of `ids`."""
+        ids = np.array(ids, dtype='int64')
+        vectors = self.index.reconstruct_batch(ids) if len(ids) else np.empty((0, self.dimension), dtype='float32')
+        nlist = self._nlist_for(len(ids))
+        base = build_faiss_index(index_type, self.dimension, self._base_metric(), nlist=nlist, pq_m=self.pq_m, hnsw_m=self.hnsw_m)
+        if index_type.startswith("ivf"):
+            # Train on a random sample rather than the full corpus
+            sample_size = min(len(ids), 64 * nlist)
+            sample = vectors[np.random.default_rng(0).choice(len(ids), sample_size, replace=False)]
+            base.train(sample)
+            index = base  # IVF indexes store arbitrary IDs natively
+        else:
+            index = faiss.IndexIDMap2(base)
+        if len(ids):
+            index.add_with_ids(vectors, ids)
+        self.index = index
+        self.built_type = index_type
+        self.deleted = set()
+        self._live_selector = None
+        self.set_search_params()
+
+    def set_search_params(self, nprobe=None, ef_search=None):
+        """Tune recall against speed for approximate indexes."""
+        if nprobe is not None:
+            self.nprobe = nprobe
+        if ef_search is not None:
+            self.ef_search = ef_search
+        if self.built_type.startswith("ivf"):
+            faiss.extract_index_ivf(self.index).nprobe = self.nprobe
+        elif self.built_type == "hnsw":
+            faiss.downcast_index(self.index.index).hnsw.efSearch = self.ef_search
+
+    @property
+    def texts(self):
+        return list(self.chunks.values())
 
-    def add(self, embeddings, texts):
-        # Ensure embeddings are float32
-        embeddings = np.array(embeddings).astype('float32')
-        self.index.add(embeddings)
-        self.texts.extend(texts)
+    def documents(self):
+        return list(self.doc_chunks) + [doc_id for doc_id in self.doc_refs if doc_id not in self.doc_chunks]
 
-    def search(self, query_embedding, top_k=5):
+    def add(self, embeddings, texts, doc_id=None, metadata=None):
+        # Ensure embeddings are float32 (and unit length for cosine)
+        embeddings = self._prepare(embeddings)
+        ids = np.arange(self.next_id, self.next_id + len(texts), dtype='int64')
+        self.index.add_with_ids(embeddings, ids)
+        self.next_id += len(texts)
+
+        # Leave flat search once the store is large enough for the configured backend
+        target = self._target_type(len(self.chunks) + len(texts))
+        if target != self.built_type:
+            self._rebuild(target, list(self.chunks) + ids.tolist())
+
+        metadata = metadata or [None] * len(texts)
+        for chunk_id, text, meta in zip(ids.tolist(), texts, metadata):
+            self.chunks[chunk_id] = text
+            self.chunk_docs[chunk_id] = doc_id
+            if meta:
+                self.chunk_meta[chunk_id] = meta
+        self.doc_chunks.setdefault(doc_id, []).extend(ids.tolist())
+        self.table.add(ids.tolist(), doc_id, metadata)
+        return ids.tolist()
+
+    def add_reference(self, chunk_id, doc_id, metadata=None):
+        """
+        Record that document `doc_id` also contains the stored chunk `chunk_id`, e.g. a
+        duplicate that was not stored again. The reference is listed under "sources" in
+        the chunk's metadata, and document filters and removal take it into account.
+        """
+        meta = self.chunk_meta.setdefault(chunk_id, {})
+        meta.setdefault("sources", []).append(dict(metadata or {}, doc_id=doc_id))
+        self.doc_refs.setdefault(doc_id, []).append(chunk_id)
+        self.table.share(chunk_id, doc_id)
+
+    def exclusive_chunks(self, doc_id):
+        """IDs of the document's chunks that no other document references; removing it deletes them."""
+        return [
+            chunk_id for chunk_id in self.doc_chunks.get(doc_id, [])
+            if all(source["doc_id"] == doc_id for source in self.chunk_meta.get(chunk_id, {}).get("sources", ()))
+        ]
+
+    def first_chunk(self, doc_id):
+        """ID of the chunk at the lowest (page, offset) of a document, counting the chunks it shares."""
+        def position(meta):
+            return meta.get("page") or 0, meta.get("offset") or 0
+
+        positions = [(position(self.chunk_meta.get(chunk_id, {})), chunk_id) for chunk_id in self.doc_chunks.get(doc_id, [])]
+        for chunk_id in set(self.doc_refs.get(doc_id, [])):
+            positions += [
+                (position(source), chunk_id) for source in self.chunk_meta[chunk_id]["sources"] if source["doc_id"] == doc_id
+            ]
+        return min(positions)[1] if positions else None
+
+    def _drop_references(self, doc_id):
+        for chunk_id in set(self.doc_refs.pop(doc_id, [])):
+            meta = self.chunk_meta[chunk_id]
+            meta["sources"] = [source for source in meta["sources"] if source["doc_id"] != doc_id]
+            if not meta["sources"]:
+                del meta["sources"]
+            self.table.unshare(chunk_id, doc_id)
+
+    def _transfer(self, chunk_id):
+        # The chunk's first remaining reference becomes its owner, keeping the vector in place
+        first, *rest = self.chunk_meta[chunk_id]["sources"]
+        doc_id = first["doc_id"]
+        meta = {key: value for key, value in first.items() if key != "doc_id"}
+        if rest:
+            meta["sources"] = rest
+        self.chunk_meta[chunk_id] = meta
+        self.chunk_docs[chunk_id] = doc_id
+        self.doc_chunks.setdefault(doc_id, []).append(chunk_id)
+        self.doc_refs[doc_id].remove(chunk_id)
+        if not self.doc_refs[doc_id]:
+            del self.doc_refs[doc_id]
+        self.table.unshare(chunk_id, doc_id)
+        self.table.add([chunk_id], doc_id, [meta])
+
+    def remove_document(self, doc_id):
+        """
+        Remove a document; chunks other documents still reference are kept for them.
+
+        An HNSW graph keeps the removed vectors, which searches skip, until they pass
+        TOMBSTONE_RATIO of it and the graph is rebuilt from the remaining chunks.
+        """
+        ids = self.exclusive_chunks(doc_id)
+        self._drop_references(doc_id)
+        removed = set(ids)
+        for chunk_id in self.doc_chunks.pop(doc_id, []):
+            if chunk_id not in removed:
+                self._transfer(chunk_id)
+        for chunk_id in ids:
+            del self.chunks[chunk_id]
+            del self.chunk_docs[chunk_id]
+            self.chunk_meta.pop(chunk_id, None)
+        if ids:
+            self.table.remove(ids)
+            if self.built_type == "hnsw":
+                self.deleted.update(ids)
+                self._live_selector = None
+                if len(self.deleted) > TOMBSTONE_RATIO * self.index.ntotal:
+                    self._rebuild("hnsw", list(self.chunks))
+            else:
+                self.index.remove_ids(np.array(ids, dtype='int64'))
+        return len(ids)
+
+    def document_vectors(self, doc_id):
+        """Return (embeddings, texts, metadata) stored for one document, in insertion order."""
+        ids = self.doc_chunks.get(doc_id, [])
+        if not ids:
+            return np.empty((0, self.dimension), dtype='float32'), [], []
+        vectors = self.index.reconstruct_batch(np.array(ids, dtype='int64'))
+        return vectors, [self.chunks[chunk_id] for chunk_id in ids], [self.chunk_meta.get(chunk_id) for chunk_id in ids]
+
+    def search(self, query_embedding, top_k=5, **filters):
+        # Results for every query row, flattened into one list
+        return [result for results in self.search_batch(query_embedding, top_k, **filters) for result in results]
+
+    def _search_params(self, selector):
+        if self.built_type.startswith("ivf"):
+            return faiss.SearchParametersIVF(sel=selector, nprobe=self.nprobe)
+        if self.built_type == "hnsw":
+            return faiss.SearchParametersHNSW(sel=selector, efSearch=self.ef_search)
+        return faiss.SearchParameters(sel=selector)
+
+    def _live_params(self):
+        # Search parameters that skip removed chunks; the selectors must outlive the search
+        if self._live_selector is None:
+            removed = faiss.IDSelectorBatch(np.fromiter(self.deleted, dtype='int64', count=len(self.deleted)))
+            live = faiss.IDSelectorNot(removed)
+            self._live_selector = (removed, live, self._search_params(live))
+        return self._live_selector[2]
+
+    def _search_subset(self, query_embeddings, ids, top_k):
+        """Exact search over the vectors of `ids` only; cost grows with the subset, not the corpus."""
+        vectors = self.index.reconstruct_batch(ids)
+        metric = faiss.METRIC_L2 if self._base_metric() == "l2" else faiss.METRIC_INNER_PRODUCT
+        distances, positions = faiss.knn(query_embeddings, vectors, min(top_k, len(ids)), metric=metric)
+        return distances, np.where(positions >= 0, ids[np.maximum(positions, 0)], -1)
+
+    def search_batch(self, query_embeddings, top_k=5, doc_ids=None, types=None, pages=None):
+        """
+        Search all query rows in a single FAISS call; returns one result list per query.
+
+        Args:
+            query_embeddings (array): One query vector per row.
+            top_k (int): Results per query.
+            doc_ids (list, optional): Only search chunks of these documents.
+            types (list, optional): Only search chunks of these types, e.g. ["pdf"].
+            pages (tuple, optional): Only search chunks starting in this (first, last) page range.
+        """
         # Ensure query_embedding is float32 and 2D
-        query_embedding = np.array(query_embedding).astype('float32')
-        if query_embedding.ndim == 1:
-            query_embedding = np.expand_dims(query_embedding, axis=0)
+        query_embeddings = self._prepare(query_embeddings)
 
         # Ensure query_embedding matches the index dimension
-        if query_embedding.shape[1] != self.dimension:
-            raise ValueError(f"Query embedding dimension {query_embedding.shape[1]} does not match index dimension {self.dimension}")
+        if query_embeddings.shape[1] != self.dimension:
+            raise ValueError(f"Query embedding dimension {query_embeddings.shape[1]} does not match index dimension {self.dimension}")
+
+        with span("vector_search", queries=len(query_embeddings), top_k=top_k, index=self.built_type) as current:
+            if doc_ids is None and types is None and pages is None:
+                if self.deleted:
+                    distances, indices = self.index.search(query_embeddings, top_k, params=self._live_params())
+                else:
+                    distances, indices = self.index.search(query_embeddings, top_k)
+            else:
+                ids = self.table.select(doc_ids, types, pages)
+                current.set(candidates=len(ids))
+                if not len(ids):
+                    return [[] for _ in range(len(query_embeddings))]
+                if len(ids) <= SUBSET_SEARCH_LIMIT:
+                    distances, indices = self._search_subset(query_embeddings, ids, top_k)
+                else:
+                    # Large subsets: let FAISS skip non-matching IDs while it searches
+                    selector = faiss.IDSelectorBatch(ids)
+                    distances, indices = self.index.search(query_embeddings, top_k, params=self._search_params(selector))
 
-        distances, indices = self.index.search(query_embedding, top_k)
-        
-        results = []
+        batch_results = []
         for i, idx_list in enumerate(indices):
+            results = []
             for j, idx in enumerate(idx_list):
                 if idx != -1:  # Check if a valid index was returned
-                    results.append({"text": self.texts[idx], "distance": distances[i][j]})
-        return results
\ No newline at end of file
+                    results.append(self.result(int(idx), distances[i][j], doc_ids))
+            batch_results.append(results)
+        return batch_results
+
+    def result(self, chunk_id, distance=None, doc_ids=None):
+        """
+        Search-result dict for one stored chunk (distance is None when it was not a vector hit).
+
+        A shared chunk found through a `doc_ids` filter that excludes its owner is reported
+        as the filtered document's, with that document's page and offset.
+        """
+        doc_id, meta = self.chunk_docs[chunk_id], self.chunk_meta.get(chunk_id, {})
+        if doc_ids is not None and doc_id not in doc_ids:
+            source = next((source for source in meta.get("sources", ()) if source["doc_id"] in doc_ids), None)
+            if source is not None:
+                doc_id, meta = source["doc_id"], {key: value for key, value in source.items() if key != "doc_id"}
+        return {
+            "id": chunk_id,
+            "doc_id": doc_id,
+            "text": self.chunks[chunk_id],
+            "metadata": meta,
+            "type": self.table.type_of(chunk_id),
+            "distance": distance,
+        }
+
+    def save(self, directory):
+        """Write the FAISS index and a JSON sidecar with the chunk texts to `directory`."""
+        os.makedirs(directory, exist_ok=True)
+        # Replace the index file rather than rewriting it: other processes may have it mapped
+        index_path = os.path.join(directory, INDEX_FILE)
+        faiss.write_index(self.index, index_path + ".tmp")
+        os.replace(index_path + ".tmp", index_path)
+        sidecar = {
+            "format": STORE_FORMAT,
+            "dimension": self.dimension,
+            "next_id": self.next_id,
+            "config": {
+                "index_type": self.index_type,
+                "metric": self.metric,
+                "nlist": self.nlist,
+                "pq_m": self.pq_m,
+                "hnsw_m": self.hnsw_m,
+                "nprobe": self.nprobe,
+                "ef_search": self.ef_search,
+                "promote_at": self.promote_at,
+                "promote_to": self.promote_to,
+            },
+            "built_type": self.built_type,
+            "chunks": [
+                [chunk_id, self.chunk_docs[chunk_id], text, self.chunk_meta.get(chunk_id)]
+                for chunk_id, text in self.chunks.items()
+            ],
+        }
+        # Write the sidecar last and atomically, so its presence marks a complete save
+        sidecar_path = os.path.join(directory, CHUNKS_FILE)
+        with open(sidecar_path + ".tmp", "w", encoding="utf-8") as f:
+            json.dump(sidecar, f, ensure_ascii=False, separators=(",", ":"))
+        os.replace(sidecar_path + ".tmp", sidecar_path)
+
+    @classmethod
+    def load(cls, directory, mmap=False):
+        """
+        Load a store written by save().
+
+        With mmap=True the stored vectors (flat and HNSW codes, IVF inverted lists) are
+        memory-mapped read-only instead of copied, so several processes loading the same
+        directory share one copy through the page cache; only small structures such as
+        the HNSW graph links are read into private memory. A memory-mapped store can be
+        searched but not added to.
+        """
+        with open(os.path.join(directory, CHUNKS_FILE), "r", encoding="utf-8") as f:
+            sidecar = json.load(f)
+
+        # IO_FLAG_MMAP alone only maps IVF inverted lists; MMAP_IFC maps the codes of every index type
+        flags = faiss.IO_FLAG_MMAP_IFC | faiss.IO_FLAG_READ_ONLY if mmap else 0
+        store = cls(sidecar["dimension"], **sidecar["config"])
+        store.index = faiss.read_index(os.path.join(directory, INDEX_FILE), flags)
+        store.built_type = sidecar["built_type"]
+        store.set_search_params()
+        store.next_id = sidecar["next_id"]
+        for chunk_id, doc_id, text, meta in sidecar["chunks"]:
+            store.chunks[chunk_id] = text
+            store.chunk_docs[chunk_id] = doc_id
+            if meta:
+                store.chunk_meta[chunk_id] = meta
+            store.doc_chunks.setdefault(doc_id, []).append(chunk_id)
+        if store.built_type == "hnsw":
+            # Chunks removed after the graph was built are still in it
+            stored = faiss.vector_to_array(store.index.id_map).tolist()
+            store.deleted = {chunk_id for chunk_id in stored if chunk_id not in store.chunks}
+        for doc_id, ids in store.doc_chunks.items():
+            store.table.add(ids, doc_id, [store.chunk_meta.get(chunk_id) for chunk_id in ids])
+        for chunk_id, meta in store.chunk_meta.items():
+            for source in meta.get("sources", ()):
+                store.doc_refs.setdefault(source["doc_id"], []).append(chunk_id)
+                store.table.share(chunk_id, source["doc_id"])
+        return store
+
+    @staticmethod
+    def exists(directory):
+        return os.path.exists(os.path.join(directory, CHUNKS_FILE))
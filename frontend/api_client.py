@@ -0,0 +1,63 @@
+import json
+from urllib.parse import quote
+
+import requests
+
+class ApiClient:
+    """
+    Thin client for the API server (api/server.py).
+
+    It mirrors the calls the Streamlit app makes in-process (ingest_documents,
+    RAGChain.remove_document and run_multiagent_pipeline), so the app can switch to a
+    shared server by setting ASKYOURDOCSX_API_URL.
+    """
+
+    def __init__(self, base_url, collection="default", timeout=600):
+        self.base_url = base_url.rstrip("/")
+        self.collection = collection
+        self.timeout = timeout
+
+    def _url(self, path=""):
+        return f"{self.base_url}/collections/{quote(self.collection, safe='')}{path}"
+
+    def ingest_documents(self, files, on_document=None):
+        response = requests.post(
+            self._url("/documents"),
+            files=[("files", (name, data)) for name, data in files],
+            timeout=self.timeout,
+        )
+        response.raise_for_status()
+        payload = response.json()
+        if on_document is not None:
+            for document in payload["documents"]:
+                on_document(document)
+        return payload["stats"]
+
+    def remove_document(self, name):
+        response = requests.delete(self._url(f"/documents/{quote(name, safe='')}"), timeout=self.timeout)
+        if response.status_code == 404:
+            return 0  # The server never saw the collection (e.g. it was restarted)
+        response.raise_for_status()
+        return response.json()["chunks_removed"]
+
+    def ask(self, question, persona, filters=None, on_token=None):
+        """Run the multi-agent pipeline on the server, calling on_token for each streamed answer token."""
+        response = requests.post(
+            self._url("/ask"),
+            json={"question": question, "persona": persona, "filters": filters, "stream": True},
+            stream=True,
+            timeout=self.timeout,
+        )
+        response.raise_for_status()
+        for line in response.iter_lines(decode_unicode=True):
+            if not line:
+                continue
+            event = json.loads(line)
+            if "token" in event:
+                if on_token is not None:
+                    on_token(event["token"])
+            elif "error" in event:
+                raise RuntimeError(event["error"])
+            elif "results" in event:
+                return event["results"]
+        raise RuntimeError("The server closed the stream without a result.")
@@ -1,30 +1,39 @@
 import streamlit as st
 import os
 import sys
+import threading
 import traceback
 
 # Add the parent directory to Python path BEFORE importing custom modules
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
 # Now import the custom modules
-from core.pdfreader import parse_file
-from core.imagereader import save_image_text
+from core.ingest import ingest_documents
 from core.rag_chain import RAGChain
-# The following imports are kept for completeness, though some might be indirectly used via run_multiagent_pipeline
-from core.llm import generate_answer
-from core.chunker import chunk_text
-from core.embeder import embed_chunks
-from core.vectorstore import FaissVectorStore
-from agents.action_planner import plan_action
-from agents.answer_agent import AnswerAgent
-from agents.context_miner import ContextMiner
-from agents.contradiction_hunter import find_contradictions
-from agents.persona_shifter import shift_persona
+from core.index_cache import content_hash
+from core.models import embedding_dimension, warmup
 from run_multiagent import run_multiagent_pipeline # Import the updated pipeline function
+from frontend.api_client import ApiClient
+
+# When set, the app is a thin client of the API server (api/server.py): indexes live on
+# the server and are shared, and model calls run there instead of in this script
+API_URL = os.environ.get("ASKYOURDOCSX_API_URL")
+API_COLLECTION = os.environ.get("ASKYOURDOCSX_API_COLLECTION", "default")
 
 # --- Streamlit Page Configuration ---
 st.set_page_config(page_title="AskYourDocsX", layout="wide", initial_sidebar_state="auto")
 
+# Load the models in the background once per server process, so the first page renders
+# immediately and the first upload or question doesn't pay the whole load cost
+@st.cache_resource
+def start_model_warmup():
+    thread = threading.Thread(target=warmup, kwargs={"llm": True}, daemon=True)
+    thread.start()
+    return thread
+
+if not API_URL:
+    start_model_warmup()
+
 # --- Initialize Session State ---
 # 'history' stores past questions and their multi-agent responses
 if "history" not in st.session_state:
@@ -41,8 +50,12 @@ if "rag_chain_initialized" not in st.session_state:
 
 # Initialize RAGChain only once
 if not st.session_state.rag_chain_initialized:
-    # Dimension 384 is common for sentence-transformers models like all-MiniLM-L6-v2
-    st.session_state.rag = RAGChain(dimension=384, top_k=5)
+    # The dimension comes from the model registry, so no model has to be loaded for it
+    # "auto" searches exactly until the corpus is large enough to benefit from HNSW
+    if API_URL:
+        st.session_state.rag = ApiClient(API_URL, collection=API_COLLECTION)
+    else:
+        st.session_state.rag = RAGChain(dimension=embedding_dimension(), top_k=5, index_type="auto")
     st.session_state.rag_chain_initialized = True
 
 # --- Header Section ---
@@ -58,73 +71,68 @@ upload_files = st.file_uploader(
     key="file_uploader" # Added a key for consistent behavior
 )
 
-# Process uploaded files
-if upload_files:
-    current_uploaded_files = {f["name"] for f in st.session_state.uploaded_texts}
-    new_files_uploaded = False
-    temp_all_text = ""
-
-    # Check if new files are added or existing ones are re-uploaded
-    for uploaded_file in upload_files:
-        existing_file = next((item for item in st.session_state.uploaded_texts if item["name"] == uploaded_file.name), None)
-        if uploaded_file.name not in current_uploaded_files or (existing_file and len(uploaded_file.getvalue()) != existing_file.get("size")):
-            new_files_uploaded = True
-            break
-
-    if new_files_uploaded:
-        st.session_state.uploaded_texts = [] # Clear previous uploads if new files detected
-        st.session_state.all_document_text = "" # Reset combined text
-        with st.spinner("Parsing and indexing documents... This may take a moment."):
-            for file in upload_files:
-                file_text = ""
-                try:
-                    # Check file extension and MIME types for parsing
-                    if file.name.endswith('.pdf') or file.type == "application/pdf":
-                        # Create a temporary file to save the uploaded content
-                        import tempfile
-                        with tempfile.NamedTemporaryFile(delete=False, suffix='.pdf') as temp_file:
-                            temp_file.write(file.getvalue())
-                            temp_path = temp_file.name
-                        
-                        file_text = parse_file(temp_path)
-                        os.unlink(temp_path)  # Clean up temp file
-                        
-                    elif file.name.endswith(('.docx', '.doc')) or file.type == "application/vnd.openxmlformats-officedocument.wordprocessingml.document":
-                        # Create a temporary file to save the uploaded content
-                        import tempfile
-                        with tempfile.NamedTemporaryFile(delete=False, suffix='.docx') as temp_file:
-                            temp_file.write(file.getvalue())
-                            temp_path = temp_file.name
-                        
-                        file_text = parse_file(temp_path)
-                        os.unlink(temp_path)  # Clean up temp file
-                        
-                    elif file.type in ["image/jpeg", "image/png"] or file.name.lower().endswith(('.png', '.jpg', '.jpeg')):
-                        file_text = save_image_text(file)
-                    else:
-                        st.warning(f"Unsupported file type: {file.type} for {file.name}. Skipping.")
-                        continue
-                except Exception as e:
-                    st.error(f"Error processing file {file.name}: {str(e)}")
-                    continue
-
-                if file_text:
-                    temp_all_text += file_text + "\n" # Accumulate text
-                    st.session_state.uploaded_texts.append({
-                        "name": file.name,
-                        "size": len(file.getvalue()),
-                        "preview": file_text[:300] + ("..." if len(file_text) > 300 else ""),
-                        "type": file.type
-                    })
-            st.session_state.all_document_text = temp_all_text.strip() # Store combined text
-            # Build RAG index with the combined text
-            if st.session_state.all_document_text:
-                st.session_state.rag.build_index(st.session_state.all_document_text)
-                st.success("✅ Documents indexed and ready to answer questions.")
+# Process uploaded files incrementally: only new or changed files are parsed and embedded
+upload_files = upload_files or []
+file_hashes = {f.name: content_hash(f.getvalue()) for f in upload_files}
+indexed_docs = {doc["name"]: doc for doc in st.session_state.uploaded_texts}
+changed_files = [f for f in upload_files if f.name not in indexed_docs or indexed_docs[f.name]["hash"] != file_hashes[f.name]]
+removed_names = [name for name in indexed_docs if name not in file_hashes]
+
+# Drop documents that were removed from the uploader
+for name in removed_names:
+    st.session_state.rag.remove_document(name)
+    del indexed_docs[name]
+
+if changed_files:
+    with st.spinner("Parsing and indexing documents... This may take a moment."):
+        documents = []
+        for file in changed_files:
+            # Check file extension for parsing; images are OCR'd by the same pipeline
+            if file.name.lower().endswith(('.pdf', '.docx', '.png', '.jpg', '.jpeg')):
+                documents.append(file)
             else:
-                st.warning("No text extracted from uploaded documents. Please ensure documents contain readable text.")
-    else:
-        st.info("Files already processed. Upload new files or clear cache to re-process.")
+                st.warning(f"Unsupported file type: {file.type} for {file.name}. Skipping.")
+
+        uploads = {file.name: file for file in documents}
+
+        def on_document(doc):
+            if doc["error"] is not None:
+                st.error(f"Error processing file {doc['name']}: {doc['error']}")
+            elif doc["text"]:
+                # Each file is indexed under its name; a re-uploaded file replaces its old chunks
+                indexed_docs[doc["name"]] = {
+                    "name": doc["name"],
+                    "size": len(uploads[doc["name"]].getvalue()),
+                    "hash": doc["hash"],
+                    "text": doc["text"],
+                    "preview": doc["text"][:300] + ("..." if len(doc["text"]) > 300 else ""),
+                    "type": uploads[doc["name"]].type
+                }
+
+        # Files are parsed in parallel from memory and indexed as each one finishes
+        files = [(file.name, file.getvalue()) for file in documents]
+        if API_URL:
+            ingest_stats = st.session_state.rag.ingest_documents(files, on_document=on_document)
+        else:
+            ingest_stats = ingest_documents(files, st.session_state.rag, on_document=on_document)
+        if ingest_stats["files"]:
+            st.caption(
+                f"Parsed {ingest_stats['pages']} pages at {ingest_stats['pages_per_second']:.1f} pages/s, "
+                f"embedded {ingest_stats['chunks']} chunks at {ingest_stats['chunks_per_second']:.1f} chunks/s."
+                + (f" {ingest_stats['duplicate_chunks']} duplicate chunks ({ingest_stats['dedup_ratio']:.0%}) were stored once."
+                   if ingest_stats.get("duplicate_chunks") else "")
+            )
+elif upload_files:
+    st.info("Files already processed. Upload new files or clear cache to re-process.")
+
+if changed_files or removed_names:
+    # Keep summaries and the combined text in upload order
+    st.session_state.uploaded_texts = [indexed_docs[f.name] for f in upload_files if f.name in indexed_docs]
+    st.session_state.all_document_text = "\n".join(doc["text"] for doc in st.session_state.uploaded_texts).strip() # Store combined text
+    if st.session_state.all_document_text:
+        st.success("✅ Documents indexed and ready to answer questions.")
+    elif upload_files:
+        st.warning("No text extracted from uploaded documents. Please ensure documents contain readable text.")
 
 
 # Display summaries of uploaded documents
@@ -154,6 +162,17 @@ persona = st.selectbox(
     key="persona_select"
 )
 
+# Optionally limit retrieval to some of the uploaded documents
+document_names = [doc["name"] for doc in st.session_state.uploaded_texts]
+selected_documents = st.multiselect(
+    "📚 Search only in (leave empty for all documents):",
+    document_names,
+    key="document_filter"
+)
+
+# Optional per-stage timings (spans for embedding, search, each LLM call and agent)
+show_timings = st.checkbox("⏱️ Show timing panel", key="show_timings")
+
 # ASK button
 if st.button("ASK", key="ask_button"):
     if not st.session_state.all_document_text:
@@ -161,16 +180,32 @@ if st.button("ASK", key="ask_button"):
     elif not question.strip():
         st.warning("Please enter a question to get an answer!")
     else:
+        # Render the answer token by token while the other agents run in the background
+        answer_placeholder = st.empty()
+        streamed_tokens = []
+
+        def show_token(token):
+            streamed_tokens.append(token)
+            answer_placeholder.markdown(f"**🤖 Answer:** {''.join(streamed_tokens)}")
+
         with st.spinner("🤖 Running multi-agent analysis..."):
             try:
-                # Call the updated run_multiagent_pipeline with the combined text
-                results = run_multiagent_pipeline(
-                    text_content=st.session_state.all_document_text,
-                    persona=persona,
-                    question=question
-                )
+                # Query the index built at upload time instead of re-indexing on every question
+                filters = {"doc_ids": selected_documents} if selected_documents else None
+                if API_URL:
+                    results = st.session_state.rag.ask(question, persona, filters=filters, on_token=show_token)
+                else:
+                    results = run_multiagent_pipeline(
+                        text_content=st.session_state.all_document_text,
+                        persona=persona,
+                        question=question,
+                        rag_chain=st.session_state.rag,
+                        on_token=show_token,
+                        filters=filters
+                    )
                 # Append the question and all results to history
                 st.session_state.history.append({"question": question, "results": results})
+                answer_placeholder.empty()  # The full answer is shown in the history below
             except Exception as e:
                 st.error(f"❌ An error occurred during analysis: {e}")
                 st.info("Please ensure your backend agents and core modules are correctly set up and accessible.")
@@ -211,6 +246,21 @@ else:
                 st.markdown("### Persona Shifter Output")
                 st.write(f"**Persona: {persona}**") # Display the persona used for this entry
                 st.markdown(results.get('persona_summary', 'No persona summary generated.'))
+
+            if show_timings and results.get('trace'):
+                with st.expander("⏱️ Timings"):
+                    st.caption(f"Total: {results.get('timings', {}).get('total', 0):.2f}s")
+                    st.table([
+                        {
+                            "span": s["name"],
+                            "within": s["parent"] or "",
+                            "seconds": round(s["seconds"], 3),
+                            "prompt tokens": s["attrs"].get("prompt_tokens", ""),
+                            "completion tokens": s["attrs"].get("completion_tokens", ""),
+                            "cache": s["attrs"].get("cache", ""),
+                        }
+                        for s in sorted(results['trace'], key=lambda s: s["start"])
+                    ])
         else:
             st.error("No results found for this query.")
         st.markdown("---") # Separator for each conversation turn
\ No newline at end of file
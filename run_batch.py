@@ -0,0 +1,187 @@
+"""
+Headless batch mode: answer a JSONL file of questions against a document set.
+
+Every line of the questions file is a JSON object with a "question" and optionally an
+"id", a "persona" and retrieval "filters". The documents are indexed once (known files
+are loaded from the index cache) and the questions then run through the multi-agent
+pipeline with bounded concurrency. Each result is appended to the output JSONL as soon
+as it is ready, so an interrupted run can simply be started again: questions whose IDs
+already have a successful result are skipped.
+
+    python run_batch.py --docs data/uploads --questions questions.jsonl --output results.jsonl
+"""
+import argparse
+import glob
+import json
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import numpy as np
+
+from core.ingest import ingest_documents
+from core.models import embedding_dimension
+from core.rag_chain import RAGChain
+from run_multiagent import run_multiagent_pipeline
+
+DOCUMENT_EXTENSIONS = (".pdf", ".docx", ".txt", ".png", ".jpg", ".jpeg")
+
+def collect_documents(paths):
+    """Expand files, directories and glob patterns into a sorted list of document paths."""
+    found = set()
+    for path in paths:
+        for match in glob.glob(path) or [path]:
+            if os.path.isdir(match):
+                for root, _, names in os.walk(match):
+                    found.update(os.path.join(root, name) for name in names if name.lower().endswith(DOCUMENT_EXTENSIONS))
+            elif os.path.isfile(match):
+                found.add(match)
+            else:
+                raise FileNotFoundError(f"No such document: {match}")
+    return sorted(found)
+
+def read_questions(path, default_persona):
+    questions = []
+    with open(path, "r", encoding="utf-8") as f:
+        for line_no, line in enumerate(f, start=1):
+            if not line.strip():
+                continue
+            record = json.loads(line)
+            question = record.get("question") or record.get("body")
+            if not question:
+                raise ValueError(f"{path}:{line_no} has no 'question'")
+            questions.append({
+                "id": str(record.get("id", record.get("request_id", line_no))),
+                "question": question,
+                "persona": record.get("persona", default_persona),
+                "filters": record.get("filters"),
+            })
+    return questions
+
+def completed_ids(output_path):
+    """IDs that already have a successful result in the output file."""
+    done = set()
+    if not os.path.exists(output_path):
+        return done
+    with open(output_path, "r", encoding="utf-8") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                continue  # Partial line left by a crash
+            if not record.get("error"):
+                done.add(record["id"])
+    return done
+
+def build_index(paths, top_k):
+    """Index the documents once and return (rag_chain, combined text) for the whole set."""
+    rag_chain = RAGChain(dimension=embedding_dimension(), top_k=top_k, index_type="auto")
+    files = []
+    for path in paths:
+        with open(path, "rb") as f:
+            files.append((os.path.basename(path), f.read()))
+
+    texts = {}
+    def on_document(result):
+        if result["error"]:
+            print(f"[!] {result['name']}: {result['error']}", file=sys.stderr)
+        texts[result["name"]] = result["text"]
+
+    stats = ingest_documents(files, rag_chain, on_document=on_document)
+    print(f"Indexed {stats['files']} documents ({stats['pages']} pages, {stats['chunks']} chunks, "
+          f"{stats['duplicate_chunks']} duplicates) "
+          f"in {stats['wall_seconds']:.1f}s", file=sys.stderr)
+    all_text = "\n\n".join(texts[name] for name, _ in files if texts.get(name))
+    return rag_chain, all_text
+
+def run_batch(questions, rag_chain, text_content, output_path, concurrency=2):
+    """
+    Answer questions concurrently, appending one JSON line per result to `output_path`.
+
+    Returns:
+        dict: Counts, wall-clock seconds, throughput and p50/p95 latency of this run.
+    """
+    done = completed_ids(output_path)
+    todo = [item for item in questions if item["id"] not in done]
+    write_lock = threading.Lock()
+    latencies, failed = [], 0
+
+    def answer(item):
+        started = time.perf_counter()
+        record = {"id": item["id"], "question": item["question"], "persona": item["persona"]}
+        try:
+            results = run_multiagent_pipeline(
+                text_content,
+                persona=item["persona"],
+                question=item["question"],
+                rag_chain=rag_chain,
+                filters=item["filters"],
+            )
+            record.update(results)
+        except Exception as e:
+            record["error"] = str(e)
+        record["latency_seconds"] = time.perf_counter() - started
+        return record
+
+    # Resuming after a crash may leave a partial last line; start on a fresh one
+    if os.path.exists(output_path) and os.path.getsize(output_path):
+        with open(output_path, "rb") as f:
+            f.seek(-1, os.SEEK_END)
+            needs_newline = f.read(1) != b"\n"
+    else:
+        needs_newline = False
+
+    started = time.perf_counter()
+    with open(output_path, "a", encoding="utf-8") as out, ThreadPoolExecutor(max_workers=concurrency) as pool:
+        if needs_newline:
+            out.write("\n")
+        futures = [pool.submit(answer, item) for item in todo]
+        for future in as_completed(futures):
+            record = future.result()
+            with write_lock:
+                out.write(json.dumps(record, ensure_ascii=False, default=str) + "\n")
+                out.flush()
+            if record.get("error"):
+                failed += 1
+            else:
+                latencies.append(record["latency_seconds"])
+    wall = time.perf_counter() - started
+
+    return {
+        "skipped": len(questions) - len(todo),
+        "answered": len(latencies),
+        "failed": failed,
+        "wall_seconds": wall,
+        "questions_per_second": len(latencies) / wall if wall else 0.0,
+        "p50_seconds": float(np.percentile(latencies, 50)) if latencies else 0.0,
+        "p95_seconds": float(np.percentile(latencies, 95)) if latencies else 0.0,
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--docs", nargs="+", required=True, help="Document files, directories or glob patterns")
+    parser.add_argument("--questions", required=True, help="JSONL file of questions")
+    parser.add_argument("--output", required=True, help="JSONL file results are appended to")
+    parser.add_argument("--persona", default="General Assistant", help="Persona for questions that do not set one")
+    parser.add_argument("--concurrency", type=int, default=2, help="Questions in flight at once")
+    parser.add_argument("--top-k", type=int, default=5)
+    args = parser.parse_args()
+
+    questions = read_questions(args.questions, args.persona)
+    if not (set(item["id"] for item in questions) - completed_ids(args.output)):
+        print(f"All {len(questions)} questions already answered in {args.output}", file=sys.stderr)
+        return
+
+    rag_chain, text_content = build_index(collect_documents(args.docs), args.top_k)
+    if not text_content:
+        sys.exit("No text could be extracted from the documents.")
+    stats = run_batch(questions, rag_chain, text_content, args.output, args.concurrency)
+
+    print(f"\nAnswered {stats['answered']} questions ({stats['failed']} failed, {stats['skipped']} already done) "
+          f"in {stats['wall_seconds']:.1f}s: {stats['questions_per_second']:.2f} questions/s, "
+          f"p50 {stats['p50_seconds']:.2f}s, p95 {stats['p95_seconds']:.2f}s", file=sys.stderr)
+
+if __name__ == "__main__":
+    main()
@@ -5,10 +5,77 @@ from agents.persona_shifter import shift_persona
 from agents.answer_agent import AnswerAgent
 
 from core.rag_chain import RAGChain
-from core.embeder import embed_chunks
+from core.models import embedding_dimension
+
+from core.telemetry import span, trace
+
+import contextvars
+import time
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+
+def run_stages(stages, max_workers=4, inline=None):
+    """
+    Runs a dependency graph of pipeline stages on a thread pool.
+
+    Args:
+        stages (dict): Maps a stage name to (fn, deps). fn receives the dict of results
+            computed so far and is started as soon as every stage named in deps has finished.
+        max_workers (int): Maximum number of stages running at once.
+        inline (str, optional): A stage to run on the calling thread instead of the pool,
+            e.g. one that streams output to a UI bound to that thread.
+
+    Returns:
+        tuple: (results, timings) — stage outputs by name, and per-stage plus "total"
+        wall-clock seconds.
+    """
+    results, timings = {}, {}
+    pending = dict(stages)
+    running = {}
+    started = time.perf_counter()
+
+    def timed(name, fn):
+        stage_start = time.perf_counter()
+        try:
+            with span(f"agent.{name}"):
+                return fn(results)
+        finally:
+            timings[name] = time.perf_counter() - stage_start
+
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        while pending or running:
+            # Start every stage whose dependencies are satisfied
+            for name, (fn, deps) in list(pending.items()):
+                if name != inline and all(dep in results for dep in deps):
+                    # Run in a copy of the caller's context so the stage's spans join its trace
+                    running[pool.submit(contextvars.copy_context().run, timed, name, fn)] = name
+                    del pending[name]
+            if inline in pending and all(dep in results for dep in pending[inline][1]):
+                fn, _ = pending.pop(inline)
+                results[inline] = timed(inline, fn)
+                continue
+            if not running:
+                raise ValueError(f"Unresolvable stage dependencies: {sorted(pending)}")
+
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                results[running.pop(future)] = future.result()
+
+    timings["total"] = time.perf_counter() - started
+    return results, timings
+
+def build_rag_chain(text_content: str, top_k: int = 5) -> RAGChain:
+    """
+    Builds a reusable RAGChain over the provided text content.
+
+    Build it once per document set (e.g. at upload time) and pass it to
+    run_multiagent_pipeline for every question asked against those documents.
+    """
+    rag_chain = RAGChain(dimension=embedding_dimension(), top_k=top_k)
+    rag_chain.build_index(text_content)
+    return rag_chain
 
 # Modified to accept text_content directly instead of a file_path
-def run_multiagent_pipeline(text_content: str, persona: str = "HR", question: str = "Whose resume is this?"):
+def run_multiagent_pipeline(text_content: str, persona: str = "HR", question: str = "Whose resume is this?", rag_chain: RAGChain = None, on_token=None, filters: dict = None):
     """
     Runs the multi-agent pipeline on the provided text content.
 
@@ -16,54 +83,96 @@ def run_multiagent_pipeline(text_content: str, persona: str = "HR", question: st
         text_content (str): The combined text content from all uploaded documents.
         persona (str): The chosen persona for the Persona Shifter agent.
         question (str): The user's question.
+        rag_chain (RAGChain, optional): An index already built over text_content. It is only
+            queried, so the cost of a question does not grow with the corpus. When omitted,
+            a throwaway index is built from text_content for this call.
+        on_token (callable, optional): Called with each answer token as it is generated.
+            The answer is then streamed on the calling thread while the other agents run,
+            and the downstream agents start as soon as the answer is complete.
+        filters (dict, optional): Restrict retrieval to some chunks, e.g. {"doc_ids": [...]}
+            or {"types": ["pdf"], "pages": (1, 10)}.
 
     Returns:
-        dict: A dictionary containing the outputs from all agents (context, contradictions, actions, persona_summary, answer).
+        dict: A dictionary containing the outputs from all agents (context, contradictions, actions, persona_summary, answer),
+            plus per-stage wall-clock seconds under "timings" and every span recorded
+            while answering (embedding, search, LLM calls with token counts) under "trace".
     """
     print("🔍 Running AskYourDocsX Multi-Agent System...\n")
 
     # Step 1: RAG setup
-    # The RAGChain is initialized and built with the provided text content.
+    # Reuse the caller's index when one is supplied; otherwise build one from the text content.
     # This ensures the AnswerAgent has access to the document's information.
-    dummy_emb = embed_chunks(["dummy"])
-    dim = dummy_emb.shape[1]
-    rag_chain = RAGChain(dimension=dim)
-    rag_chain.build_index(text_content)
+    if rag_chain is None:
+        rag_chain = build_rag_chain(text_content)
     answer_agent = AnswerAgent(rag_chain)
 
-    # Step 2: Context + Answer
-    # The ContextMiner extracts key context from the entire document text.
-    context = ContextMiner().run(text_content)
-    print("🧠 Context Miner Output:\n", context, "\n")
-
-    # The AnswerAgent uses the RAGChain to generate an answer to the question.
-    print(f"❓ Querying RAG: '{question}'")
-    answer = answer_agent.run(question)
-    print("🤖 Answer Agent Response:\n", answer, "\n")
-
-    # Step 3: Contradictions — needs both context & answer
-    # The Contradiction Hunter identifies any inconsistencies between the answer and the context.
-    contradictions = find_contradictions([answer], context) # Pass answer as a list
-    print("⚠️ Contradiction Hunter Output:\n", contradictions, "\n")
-
-    # Step 4: Action Planner
-    # The Action Planner suggests next steps based on the document's content.
-    actions = plan_action(text_content) # Action Planner also needs the full text
-    print("📌 Action Planner Output:\n", actions, "\n")
-
-    # Step 5: Persona View
-    # The Persona Shifter re-interprets the combined information from a specific persona's viewpoint.
-    combined_info = f"Context: {context}\nContradictions: {contradictions}\nActions: {actions}\nAnswer: {answer}"
-    persona_summary = shift_persona(combined_info, persona)
-    print("🧑‍💼 Persona Shifter Output:\n", persona_summary, "\n")
-
-    # Return all outputs for display in the frontend
+    # Stages form a small dependency graph: ContextMiner, the answer and the action plan
+    # are independent and run concurrently; the contradiction check waits for the answer
+    # and context, and the persona view waits for everything else.
+    def context_stage(results):
+        # The ContextMiner summarizes key context from the entire document set. Documents are
+        # analysed when they are indexed, so this only merges and formats their results.
+        if rag_chain.contexts:
+            context = ContextMiner().summarize(rag_chain.document_context())
+        else:
+            context = ContextMiner().run(text_content)
+        print("🧠 Context Miner Output:\n", context, "\n")
+        return context
+
+    def answer_stage(results):
+        # The AnswerAgent uses the RAGChain to generate an answer to the question.
+        print(f"❓ Querying RAG: '{question}'")
+        if on_token is None:
+            answer = answer_agent.run(question, filters=filters)
+        else:
+            tokens = []
+            for token in answer_agent.run(question, stream=True, filters=filters):
+                tokens.append(token)
+                on_token(token)
+            answer = "".join(tokens)
+        print("🤖 Answer Agent Response:\n", answer, "\n")
+        return answer
+
+    def contradictions_stage(results):
+        # The Contradiction Hunter identifies any inconsistencies between the answer and the context.
+        contradictions = find_contradictions([results["answer"]], results["context"]) # Pass answer as a list
+        print("⚠️ Contradiction Hunter Output:\n", contradictions, "\n")
+        return contradictions
+
+    def actions_stage(results):
+        # The Action Planner suggests next steps based on the document passages relevant to
+        # the question, so its prompt stays bounded no matter how large the upload is.
+        relevant_chunks, _ = rag_chain.retrieve(question, filters=filters)
+        actions = plan_action("\n\n---\n\n".join(relevant_chunks))
+        print("📌 Action Planner Output:\n", actions, "\n")
+        return actions
+
+    def persona_stage(results):
+        # The Persona Shifter re-interprets the combined information from a specific persona's viewpoint.
+        combined_info = f"Context: {results['context']}\nContradictions: {results['contradictions']}\nActions: {results['actions']}\nAnswer: {results['answer']}"
+        persona_summary = shift_persona(combined_info, persona)
+        print("🧑‍💼 Persona Shifter Output:\n", persona_summary, "\n")
+        return persona_summary
+
+    stages = {
+        "context": (context_stage, []),
+        "answer": (answer_stage, []),
+        "actions": (actions_stage, []),
+        "contradictions": (contradictions_stage, ["answer", "context"]),
+        "persona_summary": (persona_stage, ["context", "contradictions", "actions", "answer"]),
+    }
+    with trace() as spans:
+        results, timings = run_stages(stages, inline="answer" if on_token is not None else None)
+
+    # Return all outputs for display in the frontend, plus per-stage wall-clock seconds
     return {
-        "context": context,
-        "contradictions": contradictions,
-        "actions": actions,
-        "persona_summary": persona_summary,
-        "answer": answer,
+        "context": results["context"],
+        "contradictions": results["contradictions"],
+        "actions": results["actions"],
+        "persona_summary": results["persona_summary"],
+        "answer": results["answer"],
+        "timings": timings,
+        "trace": spans,
     }
 
 if __name__ == "__main__":